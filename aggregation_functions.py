@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from metrics_functions import count_cache
+
+# Categories Drawn by each Categorical Plot (the Rest are Counted Together as Other)
+TOP_CATEGORIES = {'barchart': 30, 'piechart': 10, 'heatmap': 25}
+# Bins a Numeric Heatmap Axis is Cut into
+HEATMAP_BINS = 10
+# Category Counts Kept by this Worker, keyed by Dataset Version and Plot Spec (Least Recently Used are Evicted Past this)
+COUNT_CACHE_ENTRIES = 256
+
+# Category Counts Computed by this Worker, Oldest Used First
+_cached_counts = {}
+
+
+def get_other_label(num_other):
+    return f'Other ({num_other} more)'
+
+
+def count_codes(codes, minlength, weights=None):
+    # Occurrences of each Code, or Sums of the Weights of each (e.g. Counts Merged over Chunks)
+    present = codes >= 0
+    if weights is None:
+        return np.bincount(codes[present], minlength=minlength)
+    return np.bincount(codes[present], weights=weights[present], minlength=minlength).astype(np.int64)
+
+
+def keep_top_codes(codes, num_categories, top_n, order_by_label=None, weights=None):
+    # Recode so the Top Categories (by Count) are 0..k-1 and the Rest share Code k, Counting Once with bincount
+    counts = count_codes(codes, num_categories, weights)
+    top = np.argsort(-counts, kind='stable')[:top_n]
+    top = top[counts[top] > 0]
+    if order_by_label is not None:
+        top = top[order_by_label(top)]
+
+    recode = np.full(num_categories + 1, len(top), dtype=np.int64)
+    recode[top] = np.arange(len(top))
+    recode[-1] = -1
+    num_other = int(np.count_nonzero(counts)) - len(top)
+    return recode[codes], top, num_other
+
+
+def sort_by_label(uniques):
+    # Order as Crosstab would (by Value), falling back to Text for Mixed Types
+    def order(top):
+        values = pd.Index(uniques[top])
+        try:
+            return np.argsort(values, kind='stable')
+        except TypeError:
+            return np.argsort(values.astype(str), kind='stable')
+    return order
+
+
+def factorize(values):
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def count_categories(values, top_n, weights=None):
+    # Counts of the Most Frequent Categories (as value_counts Orders them), then Other
+    codes, uniques = factorize(values)
+    codes, top, num_other = keep_top_codes(codes, len(uniques), top_n, weights=weights)
+    counts = count_codes(codes, len(top) + (num_other > 0), weights)
+    labels = [str(value) for value in uniques[top]] + ([get_other_label(num_other)] if num_other else [])
+    return {'x_labels': labels, 'y_labels': [], 'y_binned': False, 'counts': counts}
+
+
+def bin_numeric(values, bins=HEATMAP_BINS):
+    # Equal Width Bins over the Range (as pd.cut), Labelled by their Edges
+    values = values.to_numpy(dtype=np.float64)
+    edges = np.linspace(values.min(), values.max(), bins + 1) if len(values) else np.linspace(0, 1, bins + 1)
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+    labels = [f'{left:.2f} - {right:.2f}' for left, right in zip(edges[:-1], edges[1:])]
+    return codes, labels
+
+
+def count_pairs(x, y, top_n, bin_y=False, weights=None):
+    # Crosstab of the Top x and y Categories (plus Other), Counted with one bincount over Combined Codes
+    # (Rows where either is Missing, or did not Coerce, are Left Out, as Crosstab Aligns them)
+    x, y = x.align(y, join='inner')
+    if weights is not None:
+        weights = weights.reindex(x.index).to_numpy()
+    x_codes, x_uniques = factorize(x)
+    x_codes, x_top, x_other = keep_top_codes(x_codes, len(x_uniques), top_n, sort_by_label(x_uniques), weights)
+    x_labels = list(x_uniques[x_top]) + ([get_other_label(x_other)] if x_other else [])
+
+    if bin_y:
+        y_codes, y_labels = bin_numeric(y)
+    else:
+        y_codes, y_uniques = factorize(y)
+        y_codes, y_top, y_other = keep_top_codes(y_codes, len(y_uniques), top_n, sort_by_label(y_uniques), weights)
+        y_labels = list(y_uniques[y_top]) + ([get_other_label(y_other)] if y_other else [])
+
+    combined = np.where((x_codes >= 0) & (y_codes >= 0), y_codes * len(x_labels) + x_codes, -1)
+    counts = count_codes(combined, len(x_labels) * len(y_labels), weights).reshape(len(y_labels), len(x_labels))
+
+    # Bins no Value Fell in are Dropped, as Crosstab Drops Unobserved Categories
+    if bin_y:
+        observed = counts.sum(axis=1) > 0
+        counts, y_labels = counts[observed], [label for label, keep in zip(y_labels, observed) if keep]
+    return {'x_labels': x_labels, 'y_labels': y_labels, 'y_binned': bin_y, 'counts': counts}
+
+
+def merge_counts(chunks, columns):
+    # Counts of each Value (or Combination of Values) of the Columns over Chunks, in Order of First Appearance
+    # (as factorize over the Whole Column Orders them), Skipping Rows Missing any of them
+    merged = None
+    for chunk in chunks:
+        counts = chunk.groupby(columns, sort=False, observed=True, dropna=True).size()
+        merged = counts if merged is None else pd.concat([merged, counts]).groupby(level=list(range(len(columns))),
+                                                                                  sort=False, observed=True).sum()
+    if merged is None:
+        merged = pd.Series([], dtype=np.int64, index=pd.MultiIndex.from_arrays([[]] * len(columns), names=columns))
+    return merged
+
+
+def get_cached_counts(cache_key, compute):
+    # Counts are Small (Top Categories Only), so each Worker Keeps the Latest Few Hundred
+    if cache_key is None:
+        return compute()
+    counts = _cached_counts.pop(cache_key, None)
+    count_cache('counts', counts is not None)
+    if counts is None:
+        counts = compute()
+    _cached_counts[cache_key] = counts
+    while len(_cached_counts) > COUNT_CACHE_ENTRIES:
+        _cached_counts.pop(next(iter(_cached_counts)))
+    return counts
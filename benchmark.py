@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+from metrics_functions import reset_peak_rss, read_peak_rss
+
+# Rows Generated (and Written) at a Time, each from its own Seeded Generator, so Data is the Same at any Chunk Count
+GENERATE_CHUNK_SIZE = 1_000_000
+# Seconds to Wait between Polls of a Route whose Background Job is Running
+POLL_INTERVAL = 0.05
+# Seconds a Route may Take to Finish its Background Jobs
+ROUTE_TIMEOUT = 3600
+# Fraction Slower (or Bigger) than the Baseline a Route may be before it is a Regression
+REGRESSION_TOLERANCE = 0.2
+# Settings a Baseline must Share with the Results for their Routes to be Compared
+COMPARED_SETTINGS = ('num_rows', 'format')
+# Seconds (and Bytes) a Route may Exceed the Baseline by Regardless, so Noise on Fast Routes is not Flagged
+MIN_REGRESSION_SECONDS = 0.05
+MIN_REGRESSION_BYTES = 16 * 1024 ** 2
+
+CATEGORIES = ['North', 'South', 'East', 'West', 'Central', 'Overseas', 'Online', 'Wholesale', 'Retail', 'Partner']
+CATEGORY_WEIGHTS = np.array([30, 20, 15, 10, 8, 6, 5, 3, 2, 1]) / 100
+DIRTY_TOKENS = np.array(['n/a', '?', '-', 'NULL', 'unknown', ''])
+PLOT_VARIABLES = [
+    ('histogram', 'amount', ''),
+    ('density', 'amount', ''),
+    ('barchart', 'region', ''),
+    ('piechart', 'region', ''),
+    ('boxplot', 'amount', ''),
+    ('boxplot', 'amount', 'region'),
+    ('violin', 'region', 'amount'),
+    ('scatter', 'amount', 'quantity'),
+    ('line', 'date', 'amount'),
+    ('heatmap', 'region', 'flag'),
+]
+# A Conversion of every Kind, as the Edit Page Posts them
+EDITS = {
+    'convert_price': 'numeric',
+    'convert_date': 'datetime',
+    'convert_flag': 'binary',
+    'rename_id': 'row_id',
+    'dropcol_code': 'on',
+}
+# Edits both Engines Apply in the Engine Check: every Conversion, then the Row Filters with Conversions
+ENGINE_CHECK_EDITS = [
+    EDITS,
+    {'drop_duplicates': 'on', 'dropna_sparse': 'on', 'dropna_price': 'on', 'convert_date': 'datetime'},
+    {'convert_region': 'categorical', 'convert_quantity': 'numeric', 'convert_flag': 'binary'},
+]
+# Columns of the Synthetic Data whose Sketches are Checked to Merge: Numeric, Categorical, High-Cardinality and Sparse
+SKETCH_CHECK_COLUMNS = ['amount', 'region', 'code', 'sparse']
+# Rows the Chunked Engine Reads at a Time in the Engine Check, so the Dataset Spans Several Chunks
+ENGINE_CHECK_CHUNK_ROWS = 50_000
+
+
+def generate_chunk(rng, start, num_rows):
+    # Numeric, Categorical, Datetime, Dirty Text and Mostly-Null Columns, as Uploads Mix them
+    dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 10 * 365, num_rows), unit='D')
+    price = np.round(rng.lognormal(3, 1, num_rows), 2).astype(str).astype(object)
+    dirty = rng.random(num_rows) < 0.05
+    price[dirty] = rng.choice(DIRTY_TOKENS, dirty.sum())
+    sparse = rng.normal(0, 1, num_rows)
+    sparse[rng.random(num_rows) < 0.8] = np.nan
+
+    return pd.DataFrame({
+        'id': np.arange(start, start + num_rows),
+        'amount': rng.normal(100, 25, num_rows),
+        'quantity': rng.poisson(3, num_rows),
+        'region': rng.choice(CATEGORIES, num_rows, p=CATEGORY_WEIGHTS),
+        'flag': rng.choice(['yes', 'no'], num_rows),
+        'date': dates.strftime('%d/%m/%Y'),
+        'price': price,
+        'code': np.char.add('C', rng.integers(0, 10 ** 9, num_rows).astype(str)),
+        'sparse': sparse,
+    })
+
+
+def generate_dataset(path, num_rows, seed=0):
+    # Deterministic Synthetic Upload (CSV or SQLite, by Extension), Written a Chunk at a Time
+    if os.path.exists(path):
+        os.remove(path)
+    ext = os.path.splitext(path)[1].lower()
+    conn = None
+    if ext != '.csv':
+        import sqlite3
+        conn = sqlite3.connect(path)
+
+    for i, start in enumerate(range(0, num_rows, GENERATE_CHUNK_SIZE)):
+        chunk = generate_chunk(np.random.default_rng([seed, i]), start, min(GENERATE_CHUNK_SIZE, num_rows - start))
+        if conn is None:
+            chunk.to_csv(path, mode='a', header=i == 0, index=False)
+        else:
+            chunk.to_sql('benchmark', conn, if_exists='append', index=False)
+    if conn is not None:
+        conn.close()
+    return path
+
+
+def get_process_tree(pid):
+    # This Process and its Descendants (the Background Job Workers), Linux Only
+    pids = [pid]
+    for children_path in glob.glob(f'/proc/{pid}/task/*/children'):
+        try:
+            with open(children_path) as f:
+                children = f.read().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(get_process_tree(int(child)))
+    return pids
+
+
+def is_running(response):
+    # Routes Show a Progress Page (or the Data API Answers 503) until their Background Job is Done
+    return response.status_code == 503 or b'class="job-progress"' in response.data
+
+
+def time_route(client, name, method, url, num_rows, data=None):
+    # Wall Time until the Route's Response is Final (Polling as the Progress Page would), with Peak Memory
+    pids = get_process_tree(os.getpid())
+    reset_peak_rss(pids)
+    started = time.perf_counter()
+    deadline = started + ROUTE_TIMEOUT
+    response = client.open(url, method=method, data=data, follow_redirects=True)
+    while is_running(response) and time.perf_counter() < deadline:
+        time.sleep(POLL_INTERVAL)
+        response = client.get(url if method == 'GET' else response.request.path, follow_redirects=True)
+    seconds = time.perf_counter() - started
+
+    worker_peaks = [peak for pid in get_process_tree(os.getpid())[1:] if (peak := read_peak_rss(pid)) is not None]
+    return {
+        'route': name,
+        'status': response.status_code,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(num_rows / seconds, 1) if seconds else None,
+        'response_bytes': len(response.data),
+        'peak_rss_bytes': read_peak_rss(),
+        'peak_worker_rss_bytes': max(worker_peaks, default=None),
+    }
+
+
+def get_routes(file_name):
+    # Every Route (Named as Results are Compared), in the Order a User would Visit them
+    # (Read-Only Routes before the Edit, Undo and Redo)
+    columns = list(generate_chunk(np.random.default_rng(0), 0, 1).columns)
+    routes = [('POST /', 'POST', '/', {'file': file_name})]
+    routes += [(f'GET {url}', 'GET', url, None) for url in [
+        '/data/page/1',
+        '/data/page/2',
+        '/data/page/2?sort=amount&order=desc',
+        '/data/page/1?filter_column=region&filter=West',
+        '/api/data?start=0&stop=1000',
+        '/api/data?start=0&stop=1000&sort=date&format=arrow',
+        '/general_summary/',
+    ]]
+    routes += [(f'GET /summary/{col}', 'GET', f'/summary/{col}', None) for col in columns]
+    routes += [('GET /report', 'GET', '/report', None), ('GET /eda', 'GET', '/eda', None)]
+    routes += [(' '.join(['POST /eda', plot_type, var1, var2]).strip(), 'POST', '/eda',
+                {'plot_type': plot_type, 'var1': var1, 'var2': var2}) for plot_type, var1, var2 in PLOT_VARIABLES]
+    routes += [('GET /edit', 'GET', '/edit', None), ('POST /edit', 'POST', '/edit', EDITS)]
+    routes += [(f'GET {url}', 'GET', url, None) for url in ['/versions', '/versions/0/diff']]
+    routes += [('POST /undo', 'POST', '/undo', None), ('POST /redo', 'POST', '/redo', None)]
+    routes += [(f'GET /download?format={fmt}', 'GET', f'/download?format={fmt}', None)
+               for fmt in ['csv', 'csv_gzip', 'parquet', 'feather', 'db', 'log_txt']]
+    return routes
+
+
+def run_benchmark(num_rows, file_format='csv', seed=0, work_folder=None, engine=None):
+    # Work in a Scratch Folder, as the App Stores Uploads under the Working Directory
+    work_folder = work_folder or tempfile.mkdtemp(prefix='dataglimpse-benchmark-')
+    os.makedirs(work_folder, exist_ok=True)
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(work_folder)
+    try:
+        file_name = f'benchmark.{file_format}'
+        started = time.perf_counter()
+        generate_dataset(file_name, num_rows, seed)
+        generate_seconds = time.perf_counter() - started
+
+        from main import app
+        import engine_functions
+        engine_functions.EXECUTION_ENGINE = engine or engine_functions.EXECUTION_ENGINE
+        app.config['TESTING'] = True
+        client = app.test_client()
+
+        results = []
+        for name, method, url, data in get_routes(file_name):
+            if data and 'file' in data:
+                with open(file_name, 'rb') as f:
+                    results.append(time_route(client, name, method, url, num_rows, {'file': (f, file_name)}))
+            else:
+                results.append(time_route(client, name, method, url, num_rows, data))
+
+        return {
+            'num_rows': num_rows,
+            'format': file_format,
+            'seed': seed,
+            'engine': engine_functions.EXECUTION_ENGINE,
+            'file_bytes': os.path.getsize(file_name),
+            'generate_seconds': round(generate_seconds, 4),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'routes': results,
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+
+def check_engines(num_rows, seed=0, work_folder=None, chunk_rows=ENGINE_CHECK_CHUNK_ROWS):
+    # Edits Applied by the Chunked Engine (over Several Chunks) and the Pandas Engine, as Mismatches between them
+    work_folder = work_folder or tempfile.mkdtemp(prefix='dataglimpse-engines-')
+    os.makedirs(work_folder, exist_ok=True)
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(work_folder)
+    try:
+        from ingest_functions import ingest_file
+        from storage_functions import table_to_dataframe
+        from engine_functions import PandasEngine, ChunkedEngine
+
+        generate_dataset('benchmark.csv', num_rows, seed)
+        ingest_file('benchmark.csv', 'benchmark.feather')
+        mismatches = []
+        for form_data in ENGINE_CHECK_EDITS:
+            expected, expected_plan = PandasEngine().apply_edits('benchmark.feather', form_data)
+            table, plan = ChunkedEngine(chunk_rows).apply_edits('benchmark.feather', form_data)
+            if plan != expected_plan:
+                mismatches.append({'edits': form_data, 'expected': expected_plan, 'value': plan})
+                continue
+            try:
+                # Categories are Compared by Value, as Filtered Chunks List them in the Order they are Met
+                pd.testing.assert_frame_equal(table_to_dataframe(table), table_to_dataframe(expected),
+                                              check_categorical=False)
+            except AssertionError as e:
+                mismatches.append({'edits': form_data, 'difference': str(e)})
+        return mismatches
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+
+def get_setting_mismatches(results, baseline):
+    # Settings the Baseline was Run with that Differ from the Results', so its Timings are not Comparable
+    return {name: (baseline.get(name), results.get(name)) for name in COMPARED_SETTINGS
+            if baseline.get(name) != results.get(name)}
+
+
+def check_sketches(num_rows, seed=0):
+    # Sketch Profiles Merged from Two Halves of each Column, as Mismatches with the Column Sketched Whole (beyond the
+    # Error Bounds the Profiles Report)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from inference_functions import infer_column_type
+    from profile_functions import sketch_chunk, merge_column_sketches, finish_column_sketch, MISSING_VALUES
+    from sketch_functions import KLLSketch
+
+    df = generate_chunk(np.random.default_rng([seed, 0]), 0, num_rows)
+    mismatches = []
+    for col in SKETCH_CHECK_COLUMNS:
+        # Sorted, so the Halves Differ (and a Merge Keeping only one would Show)
+        series, half = df[col].sort_values(ignore_index=True), num_rows // 2
+        inferred = infer_column_type(series)
+        whole = finish_column_sketch(sketch_chunk(series, series.dtype, MISSING_VALUES, inferred), series.dtype, inferred)
+        merged = finish_column_sketch(merge_column_sketches(
+            sketch_chunk(series.iloc[:half], series.dtype, MISSING_VALUES, inferred),
+            sketch_chunk(series.iloc[half:], series.dtype, MISSING_VALUES, inferred)), series.dtype, inferred)
+
+        errors = merged['errors']
+        differences = {}
+        if abs(merged['num_unique'] - whole['num_unique']) > errors.get('num_unique', 0) * whole['num_unique']:
+            differences['num_unique'] = (whole['num_unique'], merged['num_unique'])
+        for value, count in merged['top_values'].items():
+            if abs(count - whole['top_values'].get(value, 0)) > errors.get('top_values', 0):
+                differences[f'top_values[{value}]'] = (whole['top_values'].get(value), count)
+        if 'numeric' in merged:
+            # Quartiles are Checked by their Rank in the Column, which the Rank Error Bounds
+            values = np.sort(pd.to_numeric(series, errors='coerce').dropna().to_numpy())
+            rank_error = KLLSketch().rank_error()
+            for key, fraction in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+                rank = np.searchsorted(values, merged['numeric'][key]) / len(values)
+                if abs(rank - fraction) > rank_error:
+                    differences[key] = (whole['numeric'][key], merged['numeric'][key])
+            if abs(merged['numeric']['outliers_count'] - whole['numeric']['outliers_count']) > errors['outliers_count']:
+                differences['outliers_count'] = (whole['numeric']['outliers_count'], merged['numeric']['outliers_count'])
+        if differences:
+            mismatches.append({'column': col, 'differences': differences})
+    return mismatches
+
+
+def compare_results(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    # Routes Slower, or Using more Memory, than the Baseline by more than the Tolerance (and the Noise Floor)
+    mismatches = get_setting_mismatches(results, baseline)
+    if mismatches:
+        raise ValueError('Baseline is not comparable: ' + ', '.join(
+            f'{name} {base} (baseline) vs {value}' for name, (base, value) in mismatches.items()))
+    baseline_routes = {route['route']: route for route in baseline['routes']}
+    limits = {'seconds': MIN_REGRESSION_SECONDS, 'peak_rss_bytes': MIN_REGRESSION_BYTES,
+              'peak_worker_rss_bytes': MIN_REGRESSION_BYTES}
+    regressions = []
+    for route in results['routes']:
+        base = baseline_routes.get(route['route'])
+        if base is None:
+            continue
+        if route['status'] != base['status']:
+            regressions.append({'route': route['route'], 'metric': 'status', 'baseline': base['status'],
+                                'value': route['status']})
+        for metric, min_difference in limits.items():
+            value, base_value = route.get(metric), base.get(metric)
+            if value is None or base_value is None:
+                continue
+            if value > base_value * (1 + tolerance) and value - base_value > min_difference:
+                regressions.append({'route': route['route'], 'metric': metric, 'baseline': base_value, 'value': value,
+                                    'ratio': round(value / base_value, 3) if base_value else None})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every DataGlimpse route on a synthetic dataset.')
+    parser.add_argument('--rows', type=int, default=100_000, help='rows of synthetic data to generate')
+    parser.add_argument('--format', choices=['csv', 'db'], default='csv', help='upload format')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--output', help='file to write the results JSON to (default: standard output)')
+    parser.add_argument('--baseline', help='results JSON to compare against, flagging regressions')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='fraction slower (or bigger) than the baseline that is a regression')
+    parser.add_argument('--engine', choices=['auto', 'pandas', 'chunked'], help='execution engine (default: the app\'s)')
+    parser.add_argument('--generate', metavar='PATH', help='only write the synthetic dataset to PATH')
+    parser.add_argument('--check-engines', action='store_true',
+                        help='only check the chunked engine edits the dataset as the pandas engine does')
+    parser.add_argument('--check-sketches', action='store_true',
+                        help='only check sketches merged from halves of each column agree with the column sketched whole')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_dataset(args.generate, args.rows, args.seed)
+        return 0
+    if args.check_engines or args.check_sketches:
+        mismatches = check_engines(args.rows, args.seed) if args.check_engines else []
+        mismatches += check_sketches(args.rows, args.seed) if args.check_sketches else []
+        for mismatch in mismatches:
+            print(f'Mismatch: {json.dumps(mismatch, default=str)}', file=sys.stderr)
+        return 1 if mismatches else 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        # Refuse before Running, rather than after
+        mismatches = get_setting_mismatches({'num_rows': args.rows, 'format': args.format}, baseline)
+        if mismatches:
+            parser.error('--baseline was run with ' + ', '.join(
+                f'{name} {base}, not {value}' for name, (base, value) in mismatches.items()))
+
+    results = run_benchmark(args.rows, args.format, args.seed, engine=args.engine)
+    if baseline is not None:
+        results['regressions'] = compare_results(results, baseline, args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    for regression in results.get('regressions', []):
+        print(f"Regression: {regression['route']} {regression['metric']} {regression['baseline']} -> "
+              f"{regression['value']}", file=sys.stderr)
+    return 1 if results.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from storage_functions import table_to_dataframe
+from stream_functions import ChunkSink
+from sqlite_functions import quote_identifier
+
+# Rows Inserted per executemany Call in SQLite Exports
+SQLITE_BATCH_ROWS = 10_000
+# Table Name in SQLite Exports
+SQLITE_TABLE = 'data'
+
+
+def iter_store_batches(store_path):
+    # Record Batches of the Memory-Mapped Store, so Exports only Hold one Batch at a Time
+    reader = pa.ipc.open_file(pa.memory_map(store_path))
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+    if reader.num_record_batches == 0:
+        yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+
+
+def get_schema(store_path):
+    return pa.ipc.open_file(pa.memory_map(store_path)).schema
+
+
+def batch_to_dataframe(batch, schema):
+    return table_to_dataframe(pa.Table.from_batches([batch]).replace_schema_metadata(schema.metadata))
+
+
+def get_datetime_formats(store_path, schema):
+    # Pandas Writes Datetimes without Times when every Time in the Column is Midnight, so Decide once per Column
+    # (Batches that are all Midnight in a Column that is not get the Full Format)
+    table = pa.ipc.open_file(pa.memory_map(store_path)).read_all()
+    formats = {}
+    for field in schema:
+        if pa.types.is_timestamp(field.type):
+            values = table.column(field.name)
+            dates_only = pc.all(pc.equal(pc.floor_temporal(values, unit='day'), values))
+            formats[field.name] = None if dates_only.as_py() in (True, None) else '%Y-%m-%d %H:%M:%S'
+    return formats
+
+
+def iter_csv(store_path):
+    # CSV Encoded a Batch at a Time, as df.to_csv(index=False) Writes it
+    schema = get_schema(store_path)
+    datetime_formats = get_datetime_formats(store_path, schema)
+    for i, batch in enumerate(iter_store_batches(store_path)):
+        df = batch_to_dataframe(batch, schema)
+        for col, date_format in datetime_formats.items():
+            if date_format and df[col].notna().any() and (df[col].dropna() == df[col].dropna().dt.normalize()).all():
+                df[col] = df[col].dt.strftime(date_format)
+        yield df.to_csv(index=False, header=(i == 0)).encode()
+
+
+def iter_parquet(store_path):
+    sink = ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), get_schema(store_path), compression='zstd') as writer:
+        for batch in iter_store_batches(store_path):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_feather(store_path):
+    sink = ChunkSink()
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_file(pa.PythonFile(sink, mode='w'), get_schema(store_path), options=options) as writer:
+        for batch in iter_store_batches(store_path):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def get_sqlite_type(arrow_type):
+    # Column Types as df.to_sql Creates them
+    if pa.types.is_dictionary(arrow_type):
+        return 'TEXT'
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return 'INTEGER'
+    if pa.types.is_floating(arrow_type):
+        return 'REAL'
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def write_sqlite(store_path, upload_folder):
+    # Export to a Temporary File for this Request (Removed by the Caller once Sent), in One Transaction
+    fd, db_path = tempfile.mkstemp(suffix='.db', dir=upload_folder)
+    os.close(fd)
+
+    schema = get_schema(store_path)
+    columns = ', '.join(f'{quote_identifier(field.name)} {get_sqlite_type(field.type)}' for field in schema)
+    placeholders = ', '.join('?' for _ in schema)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f'CREATE TABLE {SQLITE_TABLE} ({columns})')
+            for batch in iter_store_batches(store_path):
+                for offset in range(0, batch.num_rows, SQLITE_BATCH_ROWS):
+                    df = batch_to_dataframe(batch.slice(offset, SQLITE_BATCH_ROWS), schema)
+                    conn.executemany(f'INSERT INTO {SQLITE_TABLE} VALUES ({placeholders})', get_sqlite_rows(df))
+    finally:
+        conn.close()
+    return db_path
+
+
+def get_sqlite_rows(df):
+    # Python Values SQLite can Bind (Missing Values as NULL, Datetimes as Text as to_sql Stores them)
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype(object).map(str).where(df[col].notna(), None)
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
@@ -1,12 +1,30 @@
+import numpy as np
 import pandas as pd
+from profile_functions import find_duplicate_rows
+from inference_functions import infer_column_type, sample_values, parse_dates
+from metrics_functions import timed
 
+CONVERSIONS = ('numeric', 'datetime', 'categorical', 'binary')
+# Values Converted to 1 by a Binary Conversion (Case-Insensitive), all Others become 0
+BINARY_TRUE_VALUES = ['true', '1', 'yes']
+
+@timed('edit')
 def apply_edits(df, form_data):
-    df = df.copy()
+    plan = optimize_edit_plan(build_edit_plan(df.columns, form_data))
+    plan = add_datetime_formats(plan, lambda col: get_datetime_format(sample_values(df[col]), len(df)))
+    return run_edit_plan(df, plan)
+
+
+def build_edit_plan(columns, form_data):
+    # Record Requested Edits as Operations, in the Order the Form Lists them
+    plan = []
     columns_to_drop = []
     rename_map = {}
-    log_lines = []
 
-    for col in df.columns:
+    if form_data.get('drop_duplicates') == 'on':
+        plan.append({'op': 'drop_duplicates'})
+
+    for col in columns:
         # Check if Column is to be Dropped
         if form_data.get(f'dropcol_{col}') == 'on':
             columns_to_drop.append(col)
@@ -14,41 +32,133 @@ def apply_edits(df, form_data):
 
         # Drop NA
         if form_data.get(f'dropna_{col}') == 'on':
-            before_len = len(df)
-            df = df[df[col].notna()]
-            after_len = len(df)
-            if before_len != after_len:
-                log_lines.append(f"df = df[df['{col}'].notna()]  # Dropped {before_len - after_len} rows")
+            plan.append({'op': 'dropna', 'columns': [col]})
 
-         # Convert Variable Type
+        # Convert Variable Type
         convert_type = form_data.get(f'convert_{col}')
-        if convert_type == 'numeric':
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            log_lines.append(f"df['{col}'] = pd.to_numeric(df['{col}'], errors='coerce')")
-        elif convert_type == 'datetime':
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            log_lines.append(f"df['{col}'] = pd.to_datetime(df['{col}'], errors='coerce')")
-        elif convert_type == 'categorical':
-            df[col] = df[col].astype('category')
-            log_lines.append(f"df['{col}'] = df['{col}'].astype('category')")
-        elif convert_type == 'binary':
-            df[col] = df[col].apply(lambda x: 1 if str(x).lower() in ['true', '1', 'yes'] else 0)
-            log_lines.append(f"df['{col}'] = df['{col}'].apply(lambda x: 1 if str(x).lower() in ['true', '1', 'yes'] else 0)")
+        if convert_type in CONVERSIONS:
+            plan.append({'op': 'convert', 'column': col, 'to': convert_type})
 
         # Rename Column
         new_name = form_data.get(f'rename_{col}')
         if new_name and new_name.strip() and new_name != col:
             rename_map[col] = new_name.strip()
 
-    # Apply renaming and dropping after loop
     if columns_to_drop:
-        df.drop(columns=columns_to_drop, inplace=True)
-        log_lines.append(f"df.drop(columns={columns_to_drop}, inplace=True)")
-
+        plan.append({'op': 'drop_columns', 'columns': columns_to_drop})
     if rename_map:
-        df.rename(columns=rename_map, inplace=True)
-        log_lines.append(f"df.rename(columns={rename_map}, inplace=True)")
+        plan.append({'op': 'rename', 'columns': rename_map})
+
+    return plan
+
+
+def optimize_edit_plan(plan):
+    # Filters only Read a Column before it is Converted, so all can Run First (as one dropna over every Column)
+    dropna_columns = [col for op in plan if op['op'] == 'dropna' for col in op['columns']]
+    dropped_columns = [col for op in plan if op['op'] == 'drop_columns' for col in op['columns']]
+
+    optimized = [op for op in plan if op['op'] == 'drop_duplicates']
+    if dropna_columns:
+        optimized.append({'op': 'dropna', 'columns': dropna_columns})
+    # Drop Columns before Converting, so Dropped Columns are never Converted
+    if dropped_columns:
+        optimized.append({'op': 'drop_columns', 'columns': dropped_columns})
+    optimized += [op for op in plan if op['op'] == 'convert' and op['column'] not in dropped_columns]
+    optimized += [op for op in plan if op['op'] == 'rename']
+    return optimized
+
+
+def get_datetime_format(sample, length):
+    # The Format the Profile Detects from the same Sample (the Rows at sample_positions) of the Column
+    return infer_column_type(sample.astype(object), length)['datetime_format']
+
+
+def add_datetime_formats(plan, detect_format):
+    # Datetime Conversions Record the Detected Format (None Parses each Value on its Own), so they Convert
+    # the Values the Profile Counted as Dates
+    return [{**op, 'format': detect_format(op['column'])} if op['op'] == 'convert' and op['to'] == 'datetime' else op
+            for op in plan]
+
+
+def run_edit_plan(df, plan):
+    # Returns the Edited Dataframe and the Operations Applied (with Rows Dropped by each Filter)
+    applied = []
+    keep = np.ones(len(df), dtype=bool)
+    columns = list(df.columns)
+
+    for op in plan:
+        if op['op'] == 'drop_duplicates':
+            removed = find_duplicate_rows(df, confirm=True)['duplicate_mask']
+        elif op['op'] == 'dropna':
+            removed = df[op['columns']].isna().any(axis=1).to_numpy()
+        elif op['op'] == 'drop_columns':
+            columns = [col for col in columns if col not in op['columns']]
+            applied.append(op)
+            continue
+        else:
+            continue
+
+        # Count Rows not Already Removed by an Earlier Filter
+        dropped_rows = int(np.count_nonzero(removed & keep))
+        keep &= ~removed
+        if dropped_rows:
+            applied.append({**op, 'dropped_rows': dropped_rows})
+
+    # One Take of the Kept Rows and Columns (a New Frame, so the Loaded Dataset is Never Modified)
+    df = df.loc[keep, columns]
+
+    for op in plan:
+        if op['op'] == 'convert':
+            df[op['column']] = convert_column(df[op['column']], op['to'], op.get('format'))
+            applied.append(op)
+        elif op['op'] == 'rename':
+            df = df.rename(columns=op['columns'])
+            applied.append(op)
+
+    return df, applied
+
+
+def convert_column(series, convert_type, datetime_format=None):
+    if convert_type == 'numeric':
+        return pd.to_numeric(series, errors='coerce')
+    elif convert_type == 'datetime':
+        # Parse each Unique Value Once (as the Profile does), then Map back by Code
+        codes, uniques = pd.factorize(series)
+        dates = pd.Index(parse_dates(uniques, datetime_format))
+        return pd.Series(dates.take(codes, allow_fill=True, fill_value=pd.NaT), index=series.index)
+    elif convert_type == 'categorical':
+        return series.astype('category')
+    elif convert_type == 'binary':
+        # Compare each Unique Value Once, then Map back by Code (Missing Values are not True)
+        codes, uniques = pd.factorize(series)
+        is_true = pd.Index(uniques).astype(str).str.lower().isin(BINARY_TRUE_VALUES)
+        return np.where(codes >= 0, is_true[codes], False).astype(np.int64)
+    raise ValueError(f"Unsupported conversion: {convert_type}")
+
+
+def get_edit_script(plan):
+    # Pandas Script Reproducing the Applied Operations
+    lines = ['import pandas as pd', '']
+    for op in plan:
+        if op['op'] == 'drop_duplicates':
+            lines.append(f"df = df.drop_duplicates()  # Dropped {op['dropped_rows']} rows")
+        elif op['op'] == 'dropna':
+            lines.append(f"df = df.dropna(subset={op['columns']!r})  # Dropped {op['dropped_rows']} rows")
+        elif op['op'] == 'drop_columns':
+            lines.append(f"df = df.drop(columns={op['columns']!r})")
+        elif op['op'] == 'convert':
+            lines.append(get_conversion_line(op['column'], op['to'], op.get('format')))
+        elif op['op'] == 'rename':
+            lines.append(f"df = df.rename(columns={op['columns']!r})")
+    return '\n'.join(lines) + '\n'
 
-    log_text = "\n".join(log_lines)
 
-    return df, log_text
\ No newline at end of file
+def get_conversion_line(col, convert_type, datetime_format=None):
+    column = f"df[{col!r}]"
+    if convert_type == 'numeric':
+        return f"{column} = pd.to_numeric({column}, errors='coerce')"
+    elif convert_type == 'datetime':
+        return f"{column} = pd.to_datetime({column}.astype(object), format={datetime_format or 'mixed'!r}, errors='coerce')"
+    elif convert_type == 'categorical':
+        return f"{column} = {column}.astype('category')"
+    return f"{column} = {column}.astype(str).str.lower().isin({BINARY_TRUE_VALUES!r}).astype(int)"
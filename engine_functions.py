@@ -0,0 +1,349 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from storage_functions import load_dataset, load_column, dataframe_to_table, table_to_dataframe, \
+    get_categorical_columns, get_tmp_path, CATEGORIES_KEY, LOADED_DATASET_BYTES
+from paging_functions import open_store, count_rows, read_rows
+from inference_functions import get_inferred_type, sample_positions
+from metadata_functions import get_column_index
+from profile_functions import build_any_column_profile, find_duplicate_rows, group_duplicate_rows, hash_chunk, \
+    sketch_chunks, finish_column_sketch, get_numeric_series, ROW_MISSING_FRACTIONS
+from plotting_functions import get_plot, draw_counts, coerce_mostly_numeric, get_distribution, MAX_FLIERS
+from aggregation_functions import TOP_CATEGORIES, count_categories, count_pairs, merge_counts, get_cached_counts
+from editing_functions import apply_edits, build_edit_plan, optimize_edit_plan, convert_column, add_datetime_formats, \
+    get_datetime_format
+from ingest_functions import ColumnTypeMismatch
+from metrics_functions import timed
+
+# Engine Running Profiles, Summaries, Plots and Edits: 'pandas' (the Dataset Loaded Whole), 'chunked' (Record Batches
+# Streamed from the Memory-Mapped Store), or 'auto' (Chunked for Stores Larger than IN_MEMORY_BYTES)
+EXECUTION_ENGINE = 'auto'
+IN_MEMORY_BYTES = LOADED_DATASET_BYTES // 4
+# Rows the Chunked Engine Reads at a Time
+ENGINE_CHUNK_ROWS = 500_000
+# Rows (Evenly Spaced) the Chunked Engine Draws Plots from, other than Counts of Categories
+PLOT_SAMPLE_ROWS = 1_000_000
+
+
+def iter_store_chunks(store_path, columns=None, chunk_rows=ENGINE_CHUNK_ROWS, batch_indexes=None):
+    # Record Batches of the Memory-Mapped Store (or those at batch_indexes), Gathered into Chunks of about chunk_rows
+    # (as Arrow Tables)
+    reader, _ = open_store(store_path)
+    columns = reader.schema.names if columns is None else columns
+    batch_indexes = range(reader.num_record_batches) if batch_indexes is None else batch_indexes
+    batches, num_rows = [], 0
+    for i in batch_indexes:
+        batch = reader.get_batch(i).select(columns)
+        batches.append(batch)
+        num_rows += batch.num_rows
+        if num_rows >= chunk_rows:
+            yield pa.Table.from_batches(batches).replace_schema_metadata(reader.schema.metadata)
+            batches, num_rows = [], 0
+    if batches:
+        yield pa.Table.from_batches(batches).replace_schema_metadata(reader.schema.metadata)
+
+
+def iter_store_frames(store_path, columns=None, chunk_rows=ENGINE_CHUNK_ROWS, batch_indexes=None):
+    # Chunks as load_dataset would Give them
+    for table in iter_store_chunks(store_path, columns, chunk_rows, batch_indexes):
+        yield table_to_dataframe(table)
+
+
+def split_store_batches(store_path, parts):
+    # Record Batch Indexes of the Store in up to parts Contiguous Runs, for Workers to Sketch a Column between them
+    num_batches = open_store(store_path)[0].num_record_batches
+    return [list(indexes) for indexes in np.array_split(np.arange(num_batches), min(parts, num_batches)) if len(indexes)] \
+        or [[]]
+
+
+def get_sketch_types(store_path, col):
+    # The Column's dtype, and its Type Inferred from the same Sample Rows the Pandas Engine Infers it from
+    num_rows = count_rows(store_path)
+    sample = read_rows(store_path, sample_positions(num_rows), [col])[col]
+    dtype = pd.api.types.pandas_dtype(get_column_index(store_path)[col]['dtype'])
+    return dtype, get_inferred_type(store_path, col, sample, num_rows)
+
+
+def sketch_store_batches(store_path, col, missing_values, batch_indexes=None, chunk_rows=ENGINE_CHUNK_ROWS):
+    # Merged Sketch of a Column over some of the Store's Record Batches (all by Default)
+    dtype, inferred = get_sketch_types(store_path, col)
+    chunks = (chunk[col] for chunk in iter_store_frames(store_path, [col], chunk_rows, batch_indexes))
+    return sketch_chunks(chunks, dtype, missing_values, inferred)
+
+
+def finish_store_sketch(store_path, col, sketch):
+    return finish_column_sketch(sketch, *get_sketch_types(store_path, col))
+
+
+def read_sample(store_path, columns, sample_rows=PLOT_SAMPLE_ROWS):
+    # Evenly Spaced Rows (all of them for Smaller Datasets)
+    num_rows = count_rows(store_path)
+    if num_rows <= sample_rows:
+        return table_to_dataframe(feather.read_table(store_path, columns=columns, memory_map=True))
+    return read_rows(store_path, np.linspace(0, num_rows - 1, sample_rows).astype(np.int64), columns)
+
+
+def hash_store_rows(store_path, chunk_rows=ENGINE_CHUNK_ROWS):
+    # 64-Bit Hash of each Row, a Chunk at a Time (as hash_rows Hashes a DataFrame)
+    row_hashes = np.empty(count_rows(store_path), dtype=np.uint64)
+    start = 0
+    for chunk in iter_store_frames(store_path, chunk_rows=chunk_rows):
+        row_hashes[start:start + len(chunk)] = hash_chunk(chunk)
+        start += len(chunk)
+    return row_hashes
+
+
+def count_incomplete_rows(store_path):
+    # Rows Missing over each Fraction of their Values, Counted from the Arrow Validity of each Chunk
+    num_cols = len(open_store(store_path)[0].schema.names)
+    incomplete_rows = dict.fromkeys(ROW_MISSING_FRACTIONS, 0)
+    for chunk in iter_store_chunks(store_path):
+        row_null_counts = np.zeros(chunk.num_rows, dtype=np.int32)
+        for column in chunk.columns:
+            if column.null_count or pa.types.is_floating(column.type):
+                row_null_counts += pc.is_null(column, nan_is_null=True).to_numpy(zero_copy_only=False)
+        for fraction in ROW_MISSING_FRACTIONS:
+            incomplete_rows[fraction] += int((row_null_counts > num_cols * fraction).sum())
+    return incomplete_rows
+
+
+def get_box_bounds(numeric):
+    q1, q3 = numeric['q1'], numeric['q3']
+    return q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+
+def thin_fliers(fliers):
+    # Keep the most Extreme (and Evenly Spaced Others), as get_box_stats does
+    fliers = np.sort(fliers)
+    if len(fliers) > MAX_FLIERS:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, MAX_FLIERS).astype(int)]
+    return fliers
+
+
+class PandasEngine:
+    # Loads the Dataset (or the Columns Needed) into Memory, for Datasets that Fit
+    name = 'pandas'
+
+    def profile_column(self, store_path, col, approximate, missing_values):
+        series = load_column(store_path, col)
+        inferred = get_inferred_type(store_path, col, series)
+        column_profile = build_any_column_profile(series, approximate, missing_values, inferred)
+        column_profile.pop('null_mask')
+        return column_profile
+
+    def find_duplicates(self, store_path, confirm=False):
+        return find_duplicate_rows(load_dataset(store_path), confirm)
+
+    def get_distribution(self, store_path, col, column_profile):
+        values = get_numeric_series(load_column(store_path, col)).dropna().to_numpy(dtype=np.float64)
+        return get_distribution(values, min(15, column_profile['num_unique']))
+
+    def plot(self, store_path, var1, plot_type, var2=None, cache_key=None):
+        return get_plot(load_dataset(store_path), var1, plot_type, var2, cache_key)
+
+    def apply_edits(self, store_path, form_data):
+        # Returns the Edited Dataset (as an Arrow Table) and the Operations Applied
+        df, plan = apply_edits(load_dataset(store_path), form_data)
+        return dataframe_to_table(df.reset_index(drop=True)), plan
+
+
+class ChunkedEngine:
+    # Streams Chunks of the Memory-Mapped Store, so only a Chunk (plus Per-Row Hashes and Masks, and Per-Value Counts)
+    # is ever in Memory. Exact Profiles still Load the one Column they Profile, as Exact Quantiles need it Whole
+    name = 'chunked'
+
+    def __init__(self, chunk_rows=ENGINE_CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+
+    def profile_column(self, store_path, col, approximate, missing_values):
+        if not approximate:
+            return PandasEngine.profile_column(self, store_path, col, approximate, missing_values)
+        sketch = sketch_store_batches(store_path, col, missing_values, chunk_rows=self.chunk_rows)
+        return finish_store_sketch(store_path, col, sketch)
+
+    def find_duplicates(self, store_path, confirm=False):
+        return group_duplicate_rows(hash_store_rows(store_path, self.chunk_rows), lambda positions: read_rows(store_path, positions),
+                                    confirm)
+
+    def get_distribution(self, store_path, col, column_profile):
+        # Bins Span the Profiled Range (as np.histogram's do), and Box Stats Start from the Profiled Quartiles, so one
+        # Pass Counts the Bins and Finds the Whiskers and Outliers
+        numeric = column_profile['numeric']
+        bins = min(15, column_profile['num_unique'])
+        low, high = get_box_bounds(numeric)
+        counts = np.zeros(bins, dtype=np.int64)
+        whisker_low, whisker_high = np.inf, -np.inf
+        fliers = np.empty(0)
+        for chunk in iter_store_frames(store_path, [col], self.chunk_rows):
+            values = get_numeric_series(chunk[col]).dropna().to_numpy(dtype=np.float64)
+            counts += np.histogram(values, bins=bins, range=(numeric['min'], numeric['max']))[0]
+            inside = (values >= low) & (values <= high)
+            if inside.any():
+                whisker_low, whisker_high = min(whisker_low, values[inside].min()), max(whisker_high, values[inside].max())
+            fliers = thin_fliers(np.concatenate([fliers, values[~inside]]))
+
+        edges = np.histogram_bin_edges([], bins=bins, range=(numeric['min'], numeric['max']))
+        q1, median, q3 = numeric['q1'], numeric['median'], numeric['q3']
+        notch = 1.57 * (q3 - q1) / np.sqrt(column_profile['numeric_count'])
+        box_stats = [{
+            'label': '', 'mean': numeric['mean'], 'iqr': q3 - q1, 'q1': q1, 'med': median, 'q3': q3,
+            'cilo': median - notch, 'cihi': median + notch, 'fliers': fliers,
+            'whislo': min(whisker_low, q1), 'whishi': max(whisker_high, q3),
+        }]
+        return counts, edges, box_stats
+
+    def plot(self, store_path, var1, plot_type, var2=None, cache_key=None):
+        # Categories are Counted over every Chunk, Other Plots are Drawn from an Evenly Spaced Sample of Rows
+        columns = [var1] if var2 is None else [var1, var2]
+        if plot_type in TOP_CATEGORIES:
+            spec = (*cache_key, plot_type, var1, var2) if cache_key is not None else None
+            counts = get_cached_counts(spec, lambda: self.count_categories(store_path, columns, plot_type))
+            return draw_counts(counts, var1, plot_type, var2)
+        return get_plot(read_sample(store_path, columns), var1, plot_type, var2)
+
+    def count_categories(self, store_path, columns, plot_type):
+        # Counts of each Value (or Pair) Merged over Chunks, then Aggregated as if every Row were there
+        merged = merge_counts(iter_store_frames(store_path, columns, self.chunk_rows), columns)
+        weights = pd.Series(merged.to_numpy())
+        values = [pd.Series(merged.index.get_level_values(i)) for i in range(len(columns))]
+        if plot_type != 'heatmap':
+            return count_categories(values[0], TOP_CATEGORIES[plot_type], weights.to_numpy())
+        x, y = (coerce_mostly_numeric(axis, weights.to_numpy()) for axis in values)
+        return count_pairs(x, y, TOP_CATEGORIES[plot_type], bin_y=pd.api.types.is_numeric_dtype(y), weights=weights)
+
+    @timed('edit')
+    def apply_edits(self, store_path, form_data):
+        # Filters are Masks over all Rows (Duplicates Found from Row Hashes), then each Chunk is Filtered, Converted and
+        # Written to a File Memory-Mapped as the Edited Table. A Converted Column whose Type Differs between Chunks is
+        # Widened and the Edit Started Over, as Ingest does. Dates are Parsed in the one Format Detected for the Column
+        # (from the Sample the Pandas Engine Detects it from), not a Format Guessed per Chunk
+        plan = optimize_edit_plan(build_edit_plan(open_store(store_path)[0].schema.names, form_data))
+        num_rows = count_rows(store_path)
+        plan = add_datetime_formats(plan, lambda col: get_datetime_format(
+            read_rows(store_path, sample_positions(num_rows), [col])[col], num_rows))
+        edit_path = get_tmp_path(f'{store_path}.edit')
+        converted_types = {}
+        while True:
+            try:
+                applied = write_edited_chunks(store_path, plan, edit_path, converted_types, self.chunk_rows)
+                break
+            except ColumnTypeMismatch as e:
+                converted_types[e.column] = e.column_type
+        table = feather.read_table(edit_path, memory_map=True)
+        # Unlinked while Mapped, the File Lasts until the Table is Released
+        os.remove(edit_path)
+        return table, applied
+
+
+def get_widened_type(column_type, chunk_type):
+    # Integers Widen to Floats, anything else to Text
+    if pa.types.is_integer(column_type) and pa.types.is_floating(chunk_type) or \
+            pa.types.is_floating(column_type) and pa.types.is_integer(chunk_type):
+        return pa.float64()
+    return pa.string()
+
+
+def convert_chunk_column(chunk, col, convert_type, column_type, datetime_format=None):
+    # Converted Values, Cast to the Column's Type across Chunks (Categorical Conversions Keep the Values,
+    # the Column is Listed to Load as Categorical)
+    if convert_type == 'categorical':
+        return chunk.column(col)
+    values = convert_column(table_to_dataframe(chunk.select([col]))[col], convert_type, datetime_format)
+    array = pa.array(values, from_pandas=True)
+    if column_type is None or array.type == column_type:
+        return array
+    try:
+        return array.cast(column_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise ColumnTypeMismatch(col, get_widened_type(column_type, array.type))
+
+
+def convert_chunk(chunk, conversions, converted_types):
+    # Columns Take the Type their First Chunk Converts to (Recorded in converted_types) unless Widened
+    for op in conversions:
+        array = convert_chunk_column(chunk, op['column'], op['to'], converted_types.get(op['column']), op.get('format'))
+        converted_types.setdefault(op['column'], array.type)
+        chunk = chunk.set_column(chunk.schema.get_field_index(op['column']), op['column'], array)
+    return chunk
+
+
+def write_edited_chunks(store_path, plan, edit_path, converted_types, chunk_rows=ENGINE_CHUNK_ROWS):
+    # Returns the Operations Applied (with Rows Dropped by each Filter), as run_edit_plan does
+    schema = open_store(store_path)[0].schema
+    columns = schema.names
+    filters = [op for op in plan if op['op'] in ('drop_duplicates', 'dropna')]
+    conversions = [op for op in plan if op['op'] == 'convert']
+    for op in plan:
+        if op['op'] == 'drop_columns':
+            columns = [col for col in columns if col not in op['columns']]
+    duplicate_mask = None
+    if any(op['op'] == 'drop_duplicates' for op in filters):
+        duplicate_mask = ChunkedEngine(chunk_rows).find_duplicates(store_path, confirm=True)['duplicate_mask']
+
+    # Categorical Columns are Listed in the Schema Metadata, Following Conversions and Renames
+    categories = [col for col in get_categorical_columns(schema) if col in columns]
+    for op in conversions:
+        if op['to'] == 'categorical' and op['column'] not in categories:
+            categories.append(op['column'])
+        elif op['to'] != 'categorical' and op['column'] in categories:
+            categories.remove(op['column'])
+    names = columns
+    for op in plan:
+        if op['op'] == 'rename':
+            names = [op['columns'].get(name, name) for name in names]
+            categories = [op['columns'].get(name, name) for name in categories]
+    metadata = {CATEGORIES_KEY: json.dumps(categories)}
+
+    dropped_rows = [0] * len(filters)
+    writer = None
+    start = 0
+    try:
+        for chunk in iter_store_chunks(store_path, schema.names, chunk_rows):
+            keep = np.ones(chunk.num_rows, dtype=bool)
+            for i, op in enumerate(filters):
+                if op['op'] == 'drop_duplicates':
+                    removed = duplicate_mask[start:start + chunk.num_rows]
+                else:
+                    removed = np.zeros(chunk.num_rows, dtype=bool)
+                    for col in op['columns']:
+                        removed |= pc.is_null(chunk.column(col), nan_is_null=True).to_numpy(zero_copy_only=False)
+                dropped_rows[i] += int(np.count_nonzero(removed & keep))
+                keep &= ~removed
+            start += chunk.num_rows
+
+            chunk = chunk.select(columns).filter(pa.array(keep))
+            if not chunk.num_rows:
+                continue
+            chunk = convert_chunk(chunk, conversions, converted_types).rename_columns(names) \
+                .replace_schema_metadata(metadata)
+
+            if writer is None:
+                writer = pa.ipc.new_file(edit_path, chunk.schema)
+            writer.write_table(chunk)
+
+        # Every Row was Dropped, so Write the Columns Empty (Converted, so their Types Follow the Edit)
+        if writer is None:
+            empty = convert_chunk(schema.empty_table().select(columns), conversions, converted_types)
+            writer = pa.ipc.new_file(edit_path, empty.rename_columns(names).replace_schema_metadata(metadata).schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    applied = [{**op, 'dropped_rows': dropped} for op, dropped in zip(filters, dropped_rows) if dropped]
+    applied += [op for op in plan if op['op'] not in ('drop_duplicates', 'dropna')]
+    return applied
+
+
+# Engines by Name (Add an Engine Here to Make it Selectable)
+ENGINES = {'pandas': PandasEngine(), 'chunked': ChunkedEngine()}
+
+
+def get_engine(store_path, name=None):
+    name = name or EXECUTION_ENGINE
+    if name == 'auto':
+        name = 'chunked' if os.path.getsize(store_path) > IN_MEMORY_BYTES else 'pandas'
+    return ENGINES[name]
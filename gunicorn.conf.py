@@ -0,0 +1,13 @@
+# Read by gunicorn from the Working Directory, as the Procfile Starts it
+import os
+
+# Folder the App Stores Uploads, Datasets and Jobs in (main.UPLOAD_FOLDER)
+UPLOAD_FOLDER = 'temp'
+
+
+def on_starting(server):
+    # Clear Data in Temporary Folder Once, in the Master before any Worker Starts (Workers Share its Stores and Jobs,
+    # so none may Clear it). Imported Here, as gunicorn Loads this File before the App's Folder is on the Path
+    from storage_functions import clear_upload_folder
+    if os.path.isdir(UPLOAD_FOLDER):
+        clear_upload_folder(UPLOAD_FOLDER)
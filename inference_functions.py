@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import hashlib
+import warnings
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from storage_functions import get_file_signature, get_types_folder, get_tmp_path
+from metrics_functions import count_cache
+
+# Rows Sampled to Test a Column's Type, before Coercing all its Unique Values
+INFERENCE_SAMPLE_SIZE = 1000
+# Percentage Points a Sampled Parse Rate may Fall Short of a Threshold and still be Coerced in Full
+SAMPLE_MARGIN = 5
+# Values a Datetime Format is Guessed from
+FORMAT_GUESSES = 20
+# Values that could be Dates: Digits with Date or Time Separators, Run-Together Dates, or Month Names
+DATE_PATTERN = re.compile(r'\d{1,4}\s*[-/.:]\s*\d{1,2}|\b\d{8}\b|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b',
+                          re.IGNORECASE)
+
+
+def is_text_dtype(dtype):
+    # Text is Stored as Strings, or (Low-Cardinality Text, from Ingest) as Categories
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories is None or is_text_dtype(dtype.categories.dtype)
+    return dtype == 'object' or isinstance(dtype, pd.StringDtype)
+
+
+def get_logical_dtype(dtype):
+    # The dtype pandas would Read the Column as, whichever Type Ingest Stored it in (Categories for Low-Cardinality
+    # Text, the Smallest Integers that Fit)
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if is_text_dtype(dtype):
+        return 'object'
+    if isinstance(dtype, pd.CategoricalDtype):
+        return get_logical_dtype(dtype.categories.dtype)
+    if pd.api.types.is_signed_integer_dtype(dtype):
+        return 'int64'
+    return str(dtype)
+
+
+def sample_positions(length, sample_size=INFERENCE_SAMPLE_SIZE):
+    # The same Random Rows every Time, so Inference is Repeatable
+    if length <= sample_size:
+        return np.arange(length)
+    return np.random.default_rng(0).integers(0, length, sample_size)
+
+
+def sample_values(series, sample_size=INFERENCE_SAMPLE_SIZE):
+    if len(series) <= sample_size:
+        return series
+    return series.iloc[sample_positions(len(series), sample_size)]
+
+
+def detect_datetime_format(values):
+    # Of the Formats Guessed from the First Values, the one Parsing the most Values
+    # (Day-First and Month-First Dates Guess Differently Value by Value)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        formats = {guess_datetime_format(value) for value in values[:FORMAT_GUESSES]} - {None}
+    if not formats:
+        return None
+    return max(sorted(formats), key=lambda datetime_format: parse_dates(values, datetime_format).notna().sum())
+
+
+def parse_dates(values, datetime_format=None):
+    # Without a Format every Value is Parsed on its Own, which is Slow
+    values = pd.Series(np.asarray(values, dtype=object))
+    return pd.to_datetime(values, format=datetime_format or 'mixed', errors='coerce')
+
+
+def infer_column_type(series, length=None):
+    # Fractions of Sampled Rows that Parse as Numbers and as Dates (only Values that Look like Dates are Parsed)
+    # Given the Column's Length, the Series is Already its Sample (the Rows at sample_positions)
+    sample = sample_values(series) if length is None else series
+    length = len(series) if length is None else length
+    codes, uniques = pd.factorize(sample)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+    num_sampled = max(len(sample), 1)
+
+    numeric_rate = counts[pd.to_numeric(uniques, errors='coerce').notna().to_numpy()].sum() / num_sampled
+    datetime_format, datetime_rate = None, 0.0
+    if is_text_dtype(series.dtype):
+        looks_like_date = uniques.astype(str).str.contains(DATE_PATTERN).to_numpy()
+        if looks_like_date.any():
+            candidates = uniques[looks_like_date].astype(str).tolist()
+            datetime_format = detect_datetime_format(candidates)
+            dates = parse_dates(candidates, datetime_format)
+            datetime_rate = counts[looks_like_date][dates.notna().to_numpy()].sum() / num_sampled
+
+    return {
+        'exhaustive': len(sample) == length,
+        'numeric_rate': float(numeric_rate),
+        'datetime_rate': float(datetime_rate),
+        'datetime_format': datetime_format,
+    }
+
+
+def should_coerce(inferred, kind, threshold):
+    # Coerce the Whole Column only if the Sample comes Close Enough to the Threshold (a Percentage)
+    rate = inferred[f'{kind}_rate'] * 100
+    return rate >= threshold if inferred['exhaustive'] else rate >= threshold - SAMPLE_MARGIN
+
+
+def get_types_path(store_path, column):
+    # One File per Column and Dataset Version, so Concurrent Workers Never Overwrite each other's Types
+    signature = '-'.join(map(str, get_file_signature(store_path)))
+    column_key = hashlib.sha256(column.encode()).hexdigest()[:16]
+    return os.path.join(get_types_folder(store_path), f'{signature}.{column_key}.json')
+
+
+def get_inferred_type(store_path, column, series, length=None):
+    # Inferred Types are Cached per Column and Dataset Version
+    types_path = get_types_path(store_path, column)
+    count_cache('inferred_types', os.path.exists(types_path))
+    if os.path.exists(types_path):
+        with open(types_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    inferred = infer_column_type(series, length)
+    os.makedirs(get_types_folder(store_path), exist_ok=True)
+    tmp_path = get_tmp_path(types_path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(inferred, f)
+    os.replace(tmp_path, types_path)
+    return inferred
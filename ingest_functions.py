@@ -0,0 +1,224 @@
+import os
+import json
+import itertools
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from storage_functions import save_dataset, get_preview_path, table_to_dataframe, get_tmp_path, CATEGORIES_KEY
+from sqlite_functions import SQLITE_EXTENSIONS, NUMERIC_AFFINITIES, get_table_summary, iter_table_rows
+from metadata_functions import get_column_index
+from metrics_functions import timed
+
+CHUNK_SIZE = 100_000
+SAMPLE_SIZE = 10_000
+CATEGORY_THRESHOLD = 0.1
+# Rows Stored Separately so the First Page can be Shown while Ingesting
+PREVIEW_ROWS = 100
+
+INT_TYPES = ['int8', 'int16', 'int32', 'int64']
+ARROW_TYPES = {
+    'int8': pa.int8(),
+    'int16': pa.int16(),
+    'int32': pa.int32(),
+    'int64': pa.int64(),
+    'float64': pa.float64(),
+    'bool': pa.bool_(),
+    'string': pa.string(),
+    'category': pa.string(),
+}
+
+
+class ColumnTypeMismatch(Exception):
+    def __init__(self, column, column_type):
+        super().__init__(f"Column '{column}' needs type {column_type}")
+        self.column = column
+        self.column_type = column_type
+
+
+def smallest_int_type(minimum, maximum):
+    for int_type in INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= minimum and maximum <= info.max:
+            return int_type
+    return 'int64'
+
+
+def infer_column_types(sample):
+    column_types = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            column_types[col] = 'bool'
+        elif pd.api.types.is_integer_dtype(series):
+            column_types[col] = smallest_int_type(series.min(), series.max())
+        elif pd.api.types.is_float_dtype(series):
+            column_types[col] = 'float64'
+        # Low-Cardinality Text is Stored as Categorical
+        elif len(series) and series.nunique() / len(series) <= CATEGORY_THRESHOLD:
+            column_types[col] = 'category'
+        else:
+            column_types[col] = 'string'
+    return column_types
+
+
+def coerce_chunk(chunk, column_types):
+    for col, column_type in column_types.items():
+        series = chunk[col]
+        if column_type in ('string', 'category'):
+            continue
+
+        if column_type in INT_TYPES:
+            if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                if len(series):
+                    # Widen if this Chunk has Values outside the Sampled Range
+                    info = np.iinfo(column_type)
+                    minimum, maximum = series.min(), series.max()
+                    if minimum < info.min or maximum > info.max:
+                        raise ColumnTypeMismatch(col, smallest_int_type(min(minimum, info.min), max(maximum, info.max)))
+                chunk[col] = series.astype(column_type)
+            elif pd.api.types.is_float_dtype(series):
+                raise ColumnTypeMismatch(col, 'float64')
+            else:
+                raise ColumnTypeMismatch(col, 'string')
+
+        elif column_type == 'float64':
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                chunk[col] = series.astype('float64')
+            else:
+                raise ColumnTypeMismatch(col, 'string')
+
+        elif column_type == 'bool' and not pd.api.types.is_bool_dtype(series):
+            raise ColumnTypeMismatch(col, 'string')
+
+    return chunk
+
+
+def get_arrow_schema(column_types):
+    categories = [col for col, column_type in column_types.items() if column_type == 'category']
+    fields = [pa.field(col, ARROW_TYPES[column_type]) for col, column_type in column_types.items()]
+    return pa.schema(fields, metadata={CATEGORIES_KEY: json.dumps(categories)})
+
+
+def write_csv_chunks(file_path, tmp_path, column_types, on_first_chunk=None, on_progress=None):
+    # Text Columns are Read as Strings so every Chunk agrees with the Schema
+    text_columns = {col: str for col, column_type in column_types.items() if column_type in ('string', 'category')}
+    schema = get_arrow_schema(column_types)
+    file_size = max(os.path.getsize(file_path), 1)
+
+    with open(file_path, 'rb') as f, pa.ipc.new_file(tmp_path, schema) as writer:
+        for i, chunk in enumerate(pd.read_csv(f, chunksize=CHUNK_SIZE, dtype=text_columns)):
+            if i == 0 and on_first_chunk is not None:
+                on_first_chunk(chunk)
+            chunk = coerce_chunk(chunk, column_types)
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            if on_progress is not None:
+                on_progress(min(f.tell() / file_size, 1))
+
+
+def ingest_csv(file_path, store_path, on_first_chunk=None, on_progress=None):
+    # Infer Column Types from a Sample instead of the Whole File
+    sample = pd.read_csv(file_path, nrows=SAMPLE_SIZE)
+    column_types = infer_column_types(sample)
+
+    tmp_path = get_tmp_path(store_path)
+    try:
+        while True:
+            try:
+                write_csv_chunks(file_path, tmp_path, column_types, on_first_chunk, on_progress)
+                break
+            except ColumnTypeMismatch as e:
+                # Sample did not Represent the Whole File, Widen the Column and Start Over
+                column_types[e.column] = e.column_type
+                on_first_chunk = None
+        os.replace(tmp_path, store_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_sqlite_column_types(summary, sample_rows):
+    # Types Follow from the Storage Classes SQLite Counted, as Declared Types are not Enforced
+    # (Columns with Text Affinity are not Counted, SQLite Stores any Number put in them as Text)
+    column_types = {}
+    for i, (col, column_summary) in enumerate(summary['columns'].items()):
+        count = column_summary['count']
+        num_numeric = (column_summary['integer_count'] or 0) + (column_summary['real_count'] or 0)
+        if count and column_summary['integer_count'] == count and not column_summary['null_count']:
+            column_types[col] = smallest_int_type(column_summary['min'], column_summary['max'])
+        # Integers with Nulls are Floats, as Pandas Reads them
+        elif count and num_numeric == count:
+            column_types[col] = 'float64'
+        # Low-Cardinality Text is Stored as Categorical, Judged from a Sample
+        elif sample_rows and len({row[i] for row in sample_rows} - {None}) / len(sample_rows) <= CATEGORY_THRESHOLD:
+            column_types[col] = 'category'
+        else:
+            column_types[col] = 'string'
+    return column_types
+
+
+def rows_to_batch(rows, schema):
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Text Columns may also hold Numbers (or Blobs), Stored as their Text
+            arrays.append(pa.array([value if value is None or isinstance(value, str) else str(value) for value in values],
+                                   type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def ingest_sqlite(file_path, table, store_path, on_first_chunk=None, on_progress=None):
+    # Counts, Ranges and Storage Classes come from one Aggregate Query, so Chunks are Typed without Starting Over
+    summary = get_table_summary(file_path, table, distinct=[], affinities=NUMERIC_AFFINITIES)
+    chunks = iter_table_rows(file_path, table, list(summary['columns']), CHUNK_SIZE)
+    first_chunk = next(chunks, [])
+    column_types = get_sqlite_column_types(summary, first_chunk[:SAMPLE_SIZE])
+    schema = get_arrow_schema(column_types)
+
+    tmp_path = get_tmp_path(store_path)
+    try:
+        with pa.ipc.new_file(tmp_path, schema) as writer:
+            num_read = 0
+            for i, rows in enumerate(itertools.chain([first_chunk] if first_chunk else [], chunks)):
+                batch = rows_to_batch(rows, schema)
+                if i == 0 and on_first_chunk is not None:
+                    on_first_chunk(table_to_dataframe(pa.Table.from_batches([batch])))
+                writer.write_batch(batch)
+                num_read += len(rows)
+                if on_progress is not None:
+                    on_progress(min(num_read / max(summary['num_rows'], 1), 1))
+        os.replace(tmp_path, store_path)
+    finally:
+        chunks.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@timed('parse')
+def ingest_file(file_path, store_path, table=None, on_first_chunk=None, on_progress=None):
+    ext = os.path.splitext(file_path)[1].lower()
+
+    # Stream CSV Files to the Store in Chunks
+    if ext == '.csv':
+        ingest_csv(file_path, store_path, on_first_chunk, on_progress)
+
+    # Stream the Chosen Table (or View) of SQLite Files to the Store in Chunks
+    elif ext in SQLITE_EXTENSIONS:
+        ingest_sqlite(file_path, table, store_path, on_first_chunk, on_progress)
+
+    else:
+        raise ValueError(f"Unsupported File Type: {ext}")
+
+
+# Background Job: Ingest an Upload (or the Chosen Table of it), Storing the First Page as a Preview
+# and Indexing its Columns
+def ingest_upload(file_path, store_path, table, progress):
+    def save_preview(chunk):
+        save_dataset(chunk.head(PREVIEW_ROWS), get_preview_path(store_path))
+
+    progress(0, 'Reading file')
+    ingest_file(file_path, store_path, table, on_first_chunk=save_preview,
+                on_progress=lambda fraction: progress(fraction, 'Reading file'))
+    progress(1, 'Indexing columns')
+    get_column_index(store_path)
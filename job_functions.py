@@ -0,0 +1,209 @@
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from metrics_functions import span, count_cache, get_context_labels, set_context_labels, clear_pending_metrics, \
+    merge_metrics, run_measured, flush_metrics
+
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+FINISHED_STATUSES = ('done', 'error')
+# Processes a Job Spreads its Independent Tasks over (e.g. the Columns it Profiles)
+TASK_WORKERS = os.cpu_count() or 1
+# Seconds between Heartbeats of a Running Job, and Seconds without one after which its Process is Presumed Hung
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 60
+# Message of a Job whose Process Died (or Hung) before it Finished, which is Submitted Again rather than Reported
+ABANDONED_MESSAGE = 'The worker running this job stopped'
+
+# Process Pool for this Worker (Created on First Use)
+_executor = None
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result BLOB,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            owner INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created)")
+    # Tables Created before Jobs Recorded their Owner
+    if 'owner' not in {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}:
+        conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+    return conn
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Fork so Workers do not Re-Import the App
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context('fork'))
+    return _executor
+
+
+def run_tasks(tasks, progress=None, message=None, max_workers=TASK_WORKERS):
+    # Run (func, args) Tasks in Parallel Processes, Returning their Results in Order
+    # Tasks Read their Data from Memory-Mapped Files, so only Arguments and Results are Pickled
+    if max_workers <= 1 or len(tasks) <= 1:
+        results = []
+        for i, (func, args) in enumerate(tasks):
+            results.append(func(*args))
+            if progress is not None:
+                progress((i + 1) / len(tasks), message)
+        return results
+
+    # Each Task Returns the Metrics it Recorded, which the Job Flushes with its own
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks)), mp_context=context) as executor:
+        futures = [executor.submit(run_measured, func, *args) for func, args in tasks]
+        for i, _ in enumerate(as_completed(futures)):
+            if progress is not None:
+                progress((i + 1) / len(tasks), message)
+        results = []
+        for future in futures:
+            result, metrics = future.result()
+            merge_metrics(metrics)
+            results.append(result)
+        return results
+
+
+def update_job(db_path, job_id, **fields):
+    fields['updated'] = time.time()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    with connect(db_path) as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    conn.close()
+
+
+def get_job(db_path, job_id, with_result=False):
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    return fail_abandoned_job(db_path, job_from_row(row, with_result))
+
+
+def find_job(db_path, key, with_result=False):
+    # Latest Job Submitted for this Key
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE key = ? ORDER BY created DESC LIMIT 1", (key,)).fetchone()
+    conn.close()
+    return fail_abandoned_job(db_path, job_from_row(row, with_result))
+
+
+def job_from_row(row, with_result=False):
+    if row is None:
+        return None
+    job = {name: row[name] for name in row.keys() if name != 'result'}
+    if with_result:
+        job['result'] = pickle.loads(row['result']) if row['result'] is not None else None
+    return job
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_job_abandoned(job):
+    # Queued Jobs are Owned by the Worker that Submitted them, Running ones by the Pool Process Running them, which
+    # also Beats while it Runs. A Job whose Owner Died (or Stopped Beating) will never Finish
+    if job['status'] in FINISHED_STATUSES:
+        return False
+    if job['owner'] is not None and not is_process_alive(job['owner']):
+        return True
+    return job['status'] == 'running' and time.time() - job['updated'] > JOB_STALE_SECONDS
+
+
+def fail_abandoned_job(db_path, job):
+    if job is None or not is_job_abandoned(job):
+        return job
+    update_job(db_path, job['id'], status='error', message=ABANDONED_MESSAGE)
+    return {**job, 'status': 'error', 'message': ABANDONED_MESSAGE}
+
+
+def start_heartbeat(db_path, job_id):
+    # Touch the Job's Updated Time until the Returned Event is Set
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+            update_job(db_path, job_id)
+    threading.Thread(target=beat, daemon=True).start()
+    return stopped
+
+
+def run_job(db_path, job_id, func, args, labels=None):
+    # Runs inside a Pool Process, Labelling its Metrics as the Request that Submitted it
+    def progress(fraction, message=None):
+        update_job(db_path, job_id, progress=round(fraction, 4), message=message)
+
+    clear_pending_metrics()
+    set_context_labels(**(labels or {}), job=func.__name__)
+    update_job(db_path, job_id, status='running', owner=os.getpid())
+    heartbeat = start_heartbeat(db_path, job_id)
+    try:
+        with span('job'):
+            result = func(*args, progress=progress)
+    except Exception as e:
+        update_job(db_path, job_id, status='error', message=str(e))
+        return
+    finally:
+        heartbeat.set()
+        flush_metrics(db_path)
+    update_job(db_path, job_id, status='done', progress=1, result=pickle.dumps(result))
+
+
+def submit_job(db_path, key, func, *args):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with connect(db_path) as conn:
+        conn.execute("INSERT INTO jobs (id, key, status, created, updated, owner) VALUES (?, ?, 'queued', ?, ?, ?)",
+                     (job_id, key, now, now, os.getpid()))
+    conn.close()
+
+    future = get_executor().submit(run_job, db_path, job_id, func, args, get_context_labels())
+
+    # Mark Job as Failed if its Pool Process Died
+    def on_done(future):
+        if future.exception() is not None:
+            update_job(db_path, job_id, status='error', message=str(future.exception()))
+    future.add_done_callback(on_done)
+
+    return get_job(db_path, job_id)
+
+
+def get_or_submit_job(db_path, key, func, *args):
+    # Reuse a Job for the same Key, unless it Failed (or was Abandoned)
+    job = find_job(db_path, key)
+    count_cache('job', job is not None and job['status'] != 'error')
+    if job is None or job['status'] == 'error':
+        job = submit_job(db_path, key, func, *args)
+    return job
+
+
+def wait_for_job(db_path, job_id, timeout, until=None):
+    # Poll until Job Finishes (or until() is True), returning Latest Job State
+    deadline = time.time() + timeout
+    job = get_job(db_path, job_id)
+    while job['status'] not in FINISHED_STATUSES and not (until and until()) and time.time() < deadline:
+        time.sleep(0.05)
+        job = get_job(db_path, job_id)
+    return job
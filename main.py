@@ -1,13 +1,35 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify, \
+    before_render_template, template_rendered
 import math
 import os
 import io
+import time
+import uuid
 import sqlite3
-import base64
-from flask_caching import Cache
-from summary_functions import read_data, get_column_summary, get_dataframe_summary
-from editing_functions import apply_edits
-from plotting_functions import get_plot
+import hashlib
+from summary_functions import get_dataframe_summary, profile_column, profile_dataset, update_profile, build_report
+from editing_functions import get_edit_script
+from engine_functions import get_engine
+from metadata_functions import get_column_index
+from inference_functions import get_logical_dtype
+from storage_functions import get_store_path, get_preview_path, get_file_signature, load_dataset, delete_dataset, \
+    load_dataset_settings, save_dataset_settings, save_upload, link_dataset, table_to_dataframe, \
+    clear_upload_folder
+from profile_functions import MISSING_VALUES
+from plot_cache_functions import get_plot_key, is_plot_key, load_plot, save_plot, render_png, PLOT_FOLDER, PLOT_FORMATS
+from version_functions import commit_version, undo_version, redo_version, load_versions, diff_versions, get_current_plan, \
+    get_current_column_ids
+from paging_functions import get_store_columns, count_rows, get_page_rows, read_rows, read_table_rows, build_sort_index, \
+    iter_columns_json, iter_table_ipc
+from stream_functions import choose_encoding, compress_chunks
+from download_functions import iter_csv, iter_parquet, iter_feather, write_sqlite
+from ingest_functions import ingest_upload
+from sqlite_functions import SQLITE_EXTENSIONS, list_tables, summarise_table
+from metrics_functions import start_request, get_request_spans, set_context_labels, get_context_labels, \
+    get_size_label, record_span, span, timed_chunks, observe, reset_peak_rss, read_peak_rss, flush_metrics, export_metrics, \
+    BYTES_BUCKETS
+from job_functions import submit_job, get_or_submit_job, get_job, find_job, wait_for_job, FINISHED_STATUSES, \
+    ABANDONED_MESSAGE
 
 app = Flask(__name__)
 app.secret_key = 'unique'
@@ -16,46 +38,237 @@ app.secret_key = 'unique'
 UPLOAD_FOLDER = 'temp'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Clear Data in Temporary Folder
-for filename in os.listdir(UPLOAD_FOLDER):
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    if os.path.isfile(file_path) or os.path.islink(file_path):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            print(f'Failed to delete {file_path}. Reason: {e}')
-
 allowed_extensions = {'.csv', '.sqlite', '.sqlite3', '.db'}
 
+# Rows per Data Preview Page
+PAGE_SIZE = 100
+# Seconds a Request Waits on a Background Job before Showing its Progress Page
+JOB_WAIT = 1
+# Seconds the Upload Waits for the First Page to be Stored
+FIRST_PAGE_WAIT = 10
+
+# Most Rows Returned by one Data API Request
+API_MAX_ROWS = 10_000
+# Query Arguments Sorting and Filtering the Data Preview
+ROW_QUERY_ARGS = ('sort', 'order', 'filter_column', 'filter')
+
+# CSV Download Compressions -> File Extension
+CSV_COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+# Statistics Modes for Profiling (None Picks by Dataset Size)
+STATS_MODES = {'auto': None, 'exact': False, 'approx': True}
+
+# Show Time Spent per Stage at the Foot of every Page (else only when Asked for with ?timing=1)
+TIMING_FOOTER = False
+
+# Seconds Browsers may Cache a Rendered Plot
+PLOT_MAX_AGE = 86400
+
+# Table of Background Jobs, Shared by all Workers
+JOBS_DB = os.path.join(UPLOAD_FOLDER, 'jobs.db')
+
 def allowed_file(filename):
     ext = os.path.splitext(filename)[1].lower()
     return ext in allowed_extensions
 
-# Function to get Uploaded Dataframe from Cache, else read
-def get_uploaded_dataframe():
-    if 'uploaded_file' not in session:
+def get_dataset_version(store_path):
+    return '-'.join(map(str, get_file_signature(store_path)))
+
+def render_job_progress(job, title):
+    return render_template('progress.html', job=job, title=title)
+
+# Function to get the Ingestion Job for an Upload, Submitting one unless it is Running (or Failed, other than by its
+# Worker Stopping)
+def get_ingest_job(file_path, store_path, table=None):
+    job = find_job(JOBS_DB, f'ingest:{store_path}')
+    if job is None or job['status'] == 'done' or job['message'] == ABANDONED_MESSAGE:
+        job = submit_job(JOBS_DB, f'ingest:{store_path}', ingest_upload, file_path, store_path, table)
+    return job
+
+# Function to get the Session's Dataset ID and the Name of its (Shared) Upload
+def get_session_dataset():
+    return session.get('dataset_id'), session.get('upload_name')
+
+def is_sqlite_upload(upload_name):
+    return os.path.splitext(upload_name)[1] in SQLITE_EXTENSIONS
+
+# Function to get the Path of the Shared Store an Upload is Parsed into (one per Table Chosen from SQLite Files)
+def get_upload_store_path(upload_name, table=None):
+    if table is None:
+        return get_store_path(UPLOAD_FOLDER, upload_name)
+    return get_store_path(UPLOAD_FOLDER, f'{upload_name}.{hashlib.sha256(table.encode()).hexdigest()[:16]}')
+
+# Function to Start Parsing the Session's Upload into its Shared Store (unless Identical Data was Parsed Before),
+# Returning once the First Page is Stored, or the Response to Show if it Failed
+def start_ingest():
+    _, upload_name = get_session_dataset()
+    file_path = os.path.join(UPLOAD_FOLDER, upload_name)
+    store_path = get_upload_store_path(upload_name, session.get('table'))
+    if not os.path.exists(store_path):
+        job = get_ingest_job(file_path, store_path, session.get('table'))
+        preview_path = get_preview_path(store_path)
+        job = wait_for_job(JOBS_DB, job['id'], FIRST_PAGE_WAIT, until=lambda: os.path.exists(preview_path))
+        if job['status'] == 'error':
+            return f"Error reading file: {job['message']}", 400
+    return None
+
+# Function to Start a New Dataset for the Session, Clearing its Previous One
+def reset_session_dataset(upload_name, table=None):
+    dataset_id, _ = get_session_dataset()
+    if dataset_id:
+        delete_dataset(get_store_path(UPLOAD_FOLDER, dataset_id))
+    session['dataset_id'] = uuid.uuid4().hex
+    session['upload_name'] = upload_name
+    session['table'] = table
+
+# Function to get Result of a Background Job, else the Response to Show while it Runs
+def get_job_result(key, title, func, *args):
+    job = get_or_submit_job(JOBS_DB, key, func, *args)
+    if job['status'] not in FINISHED_STATUSES:
+        job = wait_for_job(JOBS_DB, job['id'], JOB_WAIT)
+
+    if job['status'] == 'error':
+        return None, (f"Error Processing Summary: {job['message']}", 400)
+    if job['status'] != 'done':
+        return None, render_job_progress(job, title)
+
+    return get_job(JOBS_DB, job['id'], with_result=True)['result'], None
+
+def get_stats_mode():
+    stats_mode = request.args.get('stats', 'auto')
+    return stats_mode if stats_mode in STATS_MODES else 'auto'
+
+# Function to get Missing Value Tokens Configured for the Dataset
+def get_missing_values(store_path):
+    return load_dataset_settings(store_path).get('missing_values', MISSING_VALUES)
+
+def get_profile_key(store_path, stats_mode='auto'):
+    missing_values = '|'.join(get_missing_values(store_path))
+    return f'profile:{stats_mode}:{store_path}:{get_dataset_version(store_path)}:{missing_values}'
+
+# Function to get Single-Pass Profile of the Stored Dataset (Built in the Background)
+# Large Datasets are Profiled with Sketches, unless Exact ('exact') or Approximate ('approx') Statistics are Asked for
+def get_profile(store_path, stats_mode='auto'):
+    approximate = STATS_MODES.get(stats_mode)
+    key = get_profile_key(store_path, stats_mode)
+    return get_job_result(key, 'Profiling Data', profile_dataset, store_path, approximate, get_missing_values(store_path))
+
+# Function to get the Key of a Column's Summary (and of its Plots)
+# Once Edited, Columns are Keyed by their Version's Column File, so Summaries Survive Edits that Leave them Unchanged
+def get_column_summary_key(store_path, column, stats_mode='auto'):
+    column_id = get_current_column_ids(store_path).get(column)
+    if column_id is None:
+        return f'column_summary:{column}:{get_profile_key(store_path, stats_mode)}'
+    missing_values = '|'.join(get_missing_values(store_path))
+    dtype = get_column_index(store_path)[column]['dtype']
+    return f'column_summary:{stats_mode}:{store_path}:{column_id}:{dtype}:{missing_values}'
+
+# Function to get Profile only if Already Built, without Starting a Job
+def find_profile(store_path, stats_mode='auto'):
+    job = find_job(JOBS_DB, get_profile_key(store_path, stats_mode), with_result=True)
+    if job is None or job['status'] != 'done':
+        return None
+    return job['result']
+
+# Function to get the Path of the Session's Dataset Store, without Loading it
+def get_uploaded_store():
+    dataset_id, upload_name = get_session_dataset()
+    if not dataset_id or not upload_name:
         return None, redirect(url_for('upload_file')), None
-    
-    filename = session.get('uploaded_file')
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    
-    if not os.path.exists(file_path):
-        return None, ("File Not Found", 404), None
-
-    # Attempt to Read Data of Uploaded File
-    df = cache.get(filename)
-    if df is None:
-        try:
-            df = read_data(file_path)
-        except Exception as e:
-            return None, (f"Error reading file: {str(e)}", 400), None
-        cache.set(filename, df, timeout=3600)
-
-    return df, None, filename
 
+    file_path = os.path.join(UPLOAD_FOLDER, upload_name)
+    if not os.path.exists(file_path):
+        return None, redirect(url_for('upload_file')), None
 
-# Initialize Cache
-cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+    # SQLite Uploads are Parsed once a Table is Chosen
+    table = session.get('table')
+    if table is None and is_sqlite_upload(upload_name):
+        return None, redirect(url_for('choose_table')), None
+
+    store_path = get_store_path(UPLOAD_FOLDER, dataset_id)
+    if not os.path.exists(store_path):
+        # Uploads are Parsed Once into a Shared Store (in the Background), which every Worker Memory-Maps
+        upload_store_path = get_upload_store_path(upload_name, table)
+        if not os.path.exists(upload_store_path):
+            job = get_ingest_job(file_path, upload_store_path, table)
+            if job['status'] == 'error':
+                return None, (f"Error reading file: {job['message']}", 400), None
+            return None, render_job_progress(job, 'Loading Data'), None
+
+        # Each Session Edits its own Dataset, Starting from the Shared Store
+        link_dataset(upload_store_path, store_path)
+
+    # Metrics of this Request (and Jobs it Submits) are Labelled by Dataset Size
+    set_context_labels(size=get_size_label(count_rows(store_path)))
+    return store_path, None, dataset_id
+
+# Function to get Sort and Filter Arguments for Paging (Building Sort Orders First), else the Response to Show
+def get_row_query(store_path, columns):
+    sort = request.args.get('sort') if request.args.get('sort') in columns else None
+    filter_column = request.args.get('filter_column') if request.args.get('filter_column') in columns else None
+    for column in dict.fromkeys([sort, filter_column]):
+        if column is not None:
+            _, error = get_sort_index(store_path, column)
+            if error:
+                return None, error
+
+    return {
+        'sort': sort,
+        'descending': request.args.get('order') == 'desc',
+        'filter_column': filter_column,
+        'filter_value': request.args.get('filter', ''),
+    }, None
+
+# Function to get Sort Order of a Column (Built in the Background, Once per Dataset Version)
+def get_sort_index(store_path, column):
+    key = f'sort:{store_path}:{get_dataset_version(store_path)}:{column}'
+    return get_job_result(key, f'Sorting by {column}', build_sort_index, store_path, column)
+
+
+# Time every Request (until its Response is Sent, as Downloads Stream) and the Templates it Renders
+@app.before_request
+def start_request_metrics():
+    start_request()
+    reset_peak_rss()
+    request.environ['dataglimpse.started'] = time.perf_counter()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    started = request.environ['dataglimpse.started']
+    labels = {'endpoint': request.endpoint or 'unmatched', 'method': request.method, **get_context_labels()}
+    status = str(response.status_code)
+
+    def on_close():
+        observe('dataglimpse_request_seconds', time.perf_counter() - started, status=status, **labels)
+        observe('dataglimpse_request_peak_rss_bytes', read_peak_rss(), BYTES_BUCKETS, **labels)
+        flush_metrics(JOBS_DB)
+    response.call_on_close(on_close)
+
+    if (TIMING_FOOTER or request.args.get('timing') == '1') and response.mimetype == 'text/html' \
+            and not response.is_streamed:
+        spans = get_request_spans()
+        footer = render_template('timing_footer.html', spans=spans, total=time.perf_counter() - started,
+                                 peak_rss=read_peak_rss())
+        response.set_data(response.get_data(as_text=True).replace('</body>', f'{footer}</body>'))
+    return response
+
+
+@before_render_template.connect_via(app)
+def start_render(sender, template, context, **extra):
+    request.environ.setdefault('dataglimpse.renders', []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def finish_render(sender, template, context, **extra):
+    record_span('render', time.perf_counter() - request.environ['dataglimpse.renders'].pop())
+
+
+@app.route('/metrics')
+def metrics():
+    # Totals of every Worker and Job, in Prometheus Text Format
+    flush_metrics(JOBS_DB)
+    return app.response_class(export_metrics(JOBS_DB), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -68,18 +281,32 @@ def upload_file():
         if not allowed_file(file.filename):
             return "Unsupported File Type", 400
 
-        # Generate and Save File to Temporary Folder
+        # Save File to Temporary Folder, under its Content Hash
         ext = os.path.splitext(file.filename)[1].lower()
-        filename = f'uploaded_file{ext}'
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-
-        # Clear Cache if Old File Exists
-        cached_df = cache.get(filename)
-        if cached_df is not None and not cached_df.empty:
-            cache.delete(filename)
-
-        file.save(file_path)
-        session['uploaded_file'] = filename
+        upload_name = save_upload(file, UPLOAD_FOLDER, ext)
+        file_path = os.path.join(UPLOAD_FOLDER, upload_name)
+
+        # SQLite Files with more than one Table (or View) are Parsed once one is Chosen
+        table = None
+        if is_sqlite_upload(upload_name):
+            try:
+                tables = list_tables(file_path, count_rows=False)
+            except sqlite3.DatabaseError as e:
+                return f"Error reading file: {e}", 400
+            if not tables:
+                return "No Tables Found", 400
+            if len(tables) > 1:
+                reset_session_dataset(upload_name)
+                return redirect(url_for('choose_table'))
+            table = tables[0]['name']
+
+        # Clear this Session's Previous Dataset, and Start a New One
+        reset_session_dataset(upload_name, table)
+
+        # Parse Upload into the Dataset Store in the Background, Returning once the First Page is Stored
+        error = start_ingest()
+        if error:
+            return error
 
         return redirect(url_for('view_data', page=1))
 
@@ -87,108 +314,316 @@ def upload_file():
     return render_template('index.html')
 
 
+@app.route('/tables', methods=['GET', 'POST'])
+def choose_table():
+    _, upload_name = get_session_dataset()
+    if not upload_name or not is_sqlite_upload(upload_name):
+        return redirect(url_for('upload_file'))
+    file_path = os.path.join(UPLOAD_FOLDER, upload_name)
+    tables = list_tables(file_path)
+
+    # Parse the Chosen Table (or View) as a New Dataset
+    if request.method == 'POST':
+        table = request.form.get('table')
+        if table not in [t['name'] for t in tables]:
+            return "Table Not Found", 404
+        reset_session_dataset(upload_name, table)
+        error = start_ingest()
+        if error:
+            return error
+        return redirect(url_for('view_data', page=1))
+
+    return render_template('tables.html', tables=tables, current=session.get('table'))
+
+
+@app.route('/tables/summary')
+def table_summary():
+    _, upload_name = get_session_dataset()
+    if not upload_name or not is_sqlite_upload(upload_name):
+        return redirect(url_for('upload_file'))
+    file_path = os.path.join(UPLOAD_FOLDER, upload_name)
+    tables = list_tables(file_path)
+    table = request.args.get('table')
+    if table not in [t['name'] for t in tables]:
+        return "Table Not Found", 404
+
+    # Counts, Ranges and Distinct Values are Aggregated by SQLite, without Loading the Table
+    key = f'table_summary:{upload_name}:{table}'
+    summary, error = get_job_result(key, f'Summarising {table}', summarise_table, file_path, table)
+    if error:
+        return error
+    return render_template('tables.html', tables=tables, current=session.get('table'), summary=summary)
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(JOBS_DB, job_id)
+    if job is None:
+        return jsonify({'error': 'Job Not Found'}), 404
+    return jsonify(job)
+
+
 @app.route('/data/page/<int:page>')
 def view_data(page=1):
-    # Get Dataframe from Cache
-    df, error, _ = get_uploaded_dataframe()
+    # Show First Page while the Rest of the Upload is Loading
+    _, upload_name = get_session_dataset()
+    if upload_name and page == 1:
+        store_path = get_upload_store_path(upload_name, session.get('table'))
+        preview_path = get_preview_path(store_path)
+        job = find_job(JOBS_DB, f'ingest:{store_path}')
+        if job and job['status'] not in FINISHED_STATUSES and os.path.exists(preview_path):
+            preview_df = load_dataset(preview_path)
+            return render_template(
+                'page.html',
+                page_data=preview_df.to_dict(orient='records'),
+                page=1,
+                total_pages=1,
+                columns=list(preview_df.columns),
+                job=job
+            )
+
+    # Get Dataset Store (Pages are Read from it Directly, without Loading the Dataframe)
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
+        return error
+    columns = get_store_columns(store_path)
+    row_query, error = get_row_query(store_path, columns)
+    if error:
+        return error
+    query = {name: value for name, value in request.args.items() if name in ROW_QUERY_ARGS}
 
     # Loads 100 Rows per Page
-    page_size = 100
-    total_pages = math.ceil(len(df) / page_size)
+    page_size = PAGE_SIZE
+    start = (page - 1) * page_size
+    end = start + page_size
+    rows, num_rows = get_page_rows(store_path, max(start, 0), end, **row_query)
+    total_pages = max(1, math.ceil(num_rows / page_size))
 
     # Return to Page 1 if Out of Bounds
     if page < 1 or page > total_pages:
-        return redirect(url_for('view_data', page=1))
+        return redirect(url_for('view_data', page=1, **query))
 
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_data = df.iloc[start:end]
+    page_data = read_rows(store_path, rows)
 
     return render_template(
         'page.html',
         page_data=page_data.to_dict(orient='records'),  # pass list of dicts for rows
         page=page,  # current page number
         total_pages=total_pages,
-        columns=list(df.columns)
+        columns=columns,
+        query=query,
+        num_rows=num_rows,
+        page_size=page_size
     )
 
 
+@app.route('/api/data')
+def api_data():
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return jsonify({'error': 'No Dataset Ready'}), 404
+    columns = get_store_columns(store_path)
+    row_query, error = get_row_query(store_path, columns)
+    if error:
+        return jsonify({'error': 'Sort Order Not Ready'}), 503
+
+    # Rows [start, stop) of the (Sorted/Filtered) Data, Projected to the Requested Columns
+    projection = [col for col in request.args.getlist('column') if col in columns] or columns
+    start = max(request.args.get('start', 0, type=int), 0)
+    stop = min(request.args.get('stop', start + PAGE_SIZE, type=int), start + API_MAX_ROWS)
+    rows, num_rows = get_page_rows(store_path, start, stop, **row_query)
+    table = read_table_rows(store_path, rows, projection)
+
+    if request.args.get('format') == 'arrow':
+        chunks, mimetype = iter_table_ipc(table), 'application/vnd.apache.arrow.stream'
+    else:
+        fields = {'start': start, 'stop': start + len(rows), 'num_rows': num_rows}
+        chunks, mimetype = iter_columns_json(table_to_dataframe(table), **fields), 'application/json'
+
+    # Compressed as it Streams, if the Client Accepts it
+    encoding = choose_encoding(request.accept_encodings)
+    response = app.response_class(compress_chunks(timed_chunks(chunks, 'serialise'), encoding), mimetype=mimetype)
+    response.headers['X-Total-Rows'] = str(num_rows)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
 @app.route('/summary/<column>')
 def column_summary(column):
-    # Get Dataframe from Cache
-    df, error, _ = get_uploaded_dataframe()
+    # Get the Dataset Store, without Loading it
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
-    
+        return error
+    if column not in get_column_index(store_path):
+        return f"Error Processing Summary: '{column}'", 400
+
     # Get Previous Page
     from_page = request.args.get('from', 'view')
 
-    try:
-        summary = get_column_summary(df, column)
-    except Exception as e:
-        return f"Error Processing Summary: {str(e)}", 400
+    # Look up Column in the Dataset Profile, then Summarise it in the Background
+    stats_mode = get_stats_mode()
+    profile, error = get_profile(store_path, stats_mode)
+    if error:
+        return error
+
+    key = get_column_summary_key(store_path, column, stats_mode)
+    summary, error = get_job_result(key, f'Summarising {column}', profile_column, store_path, column, profile['columns'][column],
+                                    PLOT_FOLDER, key)
+    if error:
+        return error
 
-    return render_template('summary.html', column=column, summary=summary, from_page=from_page, is_col=True)
+    return render_template('summary.html', column=column, summary=summary, from_page=from_page, is_col=True,
+                           approximate=profile['approximate'])
 
 
 @app.route('/general_summary/')
 def general_summary():
-    # Get Dataframe from Cache
-    df, error, _ = get_uploaded_dataframe()
+    # Get the Dataset Store, without Loading it
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
+        return error
 
     # Get Previous Page
     from_page = request.args.get('from', 'view')
 
-    try:
-        summary = get_dataframe_summary(df)
-    except Exception as e:
-        return f"Error Processing Summary: {str(e)}", 400
+    # Summarise DataFrame from its Profile
+    profile, error = get_profile(store_path, get_stats_mode())
+    if error:
+        return error
+    summary = get_dataframe_summary(None, profile)
+
+    return render_template('summary.html', column='dataframe', summary=summary, from_page=from_page, is_col=False,
+                           approximate=profile['approximate'], missing_values=get_missing_values(store_path))
+
+
+@app.route('/report')
+def full_report():
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return error
+
+    # Summarise the DataFrame, then every Column (Spread over Processes), Sharing Plots with the Column Pages
+    stats_mode = get_stats_mode()
+    profile, error = get_profile(store_path, stats_mode)
+    if error:
+        return error
+    plot_keys = {col: get_column_summary_key(store_path, col, stats_mode) for col in profile['column_names']}
+    key = f'report:{get_profile_key(store_path, stats_mode)}'
+    column_summaries, error = get_job_result(key, 'Summarising Columns', build_report, store_path, profile, PLOT_FOLDER,
+                                             plot_keys)
+    if error:
+        return error
+
+    return render_template('summary.html', column='dataframe', summary=get_dataframe_summary(None, profile),
+                           from_page=request.args.get('from', 'view'), is_col=False, approximate=profile['approximate'],
+                           column_summaries=column_summaries)
+
+
+@app.route('/missing_values', methods=['POST'])
+def update_missing_values():
+    filename, _ = get_session_dataset()
+    if not filename:
+        return redirect(url_for('upload_file'))
+
+    # Tokens are Compared Stripped and Uppercased, so Store them that way
+    tokens = [token.strip().upper() for token in request.form.get('missing_values', '').split(',')]
+    missing_values = list(dict.fromkeys(tokens))
 
-    return render_template('summary.html', column='dataframe', summary=summary, from_page=from_page, is_col=False)
+    store_path = get_store_path(UPLOAD_FOLDER, filename)
+    settings = load_dataset_settings(store_path)
+    settings['missing_values'] = missing_values
+    save_dataset_settings(store_path, settings)
+
+    return redirect(url_for('general_summary'))
 
 
 @app.route('/edit', methods=['GET', 'POST'])
 def edit_data():
-    # Get Dataframe from Cache
-    df, error, filename = get_uploaded_dataframe()
+    # Get the Dataset Store, Loading it only to Edit it
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
+        return error
     
     if request.method == 'POST':
-        df, log_text = apply_edits(df, request.form)
-        cache.set(filename, df, timeout=3600)
-
-        # Append log_text to File
-        log_path = os.path.join(UPLOAD_FOLDER, 'edit_logs.txt')
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(log_text + "\n")
+        # Each Edit is a New Version (Sharing Unchanged Columns), with the Operations Applied by the Dataset's Engine
+        table, plan = get_engine(store_path).apply_edits(store_path, request.form)
+        if plan:
+            # Profiles Built before the Edit are Carried through it, Rescanning only the Columns it Changed
+            profiles = {stats_mode: find_profile(store_path, stats_mode) for stats_mode in STATS_MODES}
+            commit_version(store_path, table, plan)
+            for stats_mode, profile in profiles.items():
+                if profile is not None:
+                    get_or_submit_job(JOBS_DB, get_profile_key(store_path, stats_mode), update_profile, store_path,
+                                      profile, plan, STATS_MODES[stats_mode], get_missing_values(store_path))
 
         return redirect(url_for('view_data', page=1))
     
-    # Get Number of Unique Values per Column
-    unique_values_map = {
-        col: df[col].dropna().nunique() for col in df.columns
-    }
-    # Get Column Datatypes
-    dtypes_map = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    # Get Number of Unique Values and Datatype per Column from the Column Index
+    index = get_column_index(store_path)
+    unique_values_map = {col: metadata['num_unique'] for col, metadata in index.items()}
+    dtypes_map = {col: get_logical_dtype(metadata['dtype']) for col, metadata in index.items()}
+    # Get Number of Duplicate Rows, if Data has been Profiled
+    profile = find_profile(store_path)
+    num_duplicate_rows = profile['num_duplicate_rows'] if profile else None
 
     return render_template('edit.html',
-                           columns=list(df.columns),
+                           columns=list(index),
                            unique_values_map=unique_values_map,
-                           dtypes_map=dtypes_map)
+                           dtypes_map=dtypes_map,
+                           num_duplicate_rows=num_duplicate_rows)
+
+
+@app.route('/versions')
+def versions():
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return error
+
+    versions = load_versions(store_path)
+    return render_template('versions.html', versions=versions['versions'], current=versions['current'])
+
+
+@app.route('/versions/<int:version_id>/diff')
+def version_diff(version_id):
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return error
+
+    diff = diff_versions(store_path, version_id)
+    if diff is None:
+        return "Version Not Found", 404
+    return render_template('versions.html', diff=diff, script=get_edit_script(diff['ops']))
+
+
+@app.route('/undo', methods=['POST'])
+def undo():
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return error
+
+    undo_version(store_path)
+    return redirect(url_for('versions'))
+
+
+@app.route('/redo', methods=['POST'])
+def redo():
+    store_path, error, _ = get_uploaded_store()
+    if error:
+        return error
+
+    redo_version(store_path)
+    return redirect(url_for('versions'))
 
 
 @app.route('/eda', methods=['GET', 'POST'])
 def eda():
-    df, error, _ = get_uploaded_dataframe()
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
+        return error
 
-    columns = list(df.columns)
+    columns = list(get_column_index(store_path))
 
     # Variable Counts for each Plot Type
     plot_var_counts = {
@@ -208,66 +643,93 @@ def eda():
     var2 = request.form.get('var2')
     var_count = plot_var_counts.get(plot_type) if plot_type else None
 
-    fig = None
+    plot_vars = None
     if plot_type and var1:
         if var_count == 1:
-            fig = get_plot(df, var1, plot_type)
+            plot_vars = (var1,)
         elif isinstance(var_count, list) and 2 in var_count:
-            if var2:
-                fig = get_plot(df, var1, plot_type, var2)
-            else:
-                fig = get_plot(df, var1, plot_type)
+            plot_vars = (var1, var2) if var2 else (var1,)
         elif var_count == 2 and var2:
-            fig = get_plot(df, var1, plot_type, var2)
-    
-    if fig:
-        img = io.BytesIO()
-        fig.savefig(img, format='png')
-        img.seek(0)
-        plot_data = base64.b64encode(img.getvalue()).decode('utf8')
-    else:
-        plot_data = None
+            plot_vars = (var1, var2)
+
+    plot_url = None
+    if plot_vars:
+        # Render each Plot Once per Dataset Version, then Serve it from the Plot Cache
+        key = get_plot_key(store_path, get_dataset_version(store_path), plot_type, *plot_vars)
+        if not load_plot(PLOT_FOLDER, key):
+            fig = get_engine(store_path).plot(store_path, plot_vars[0], plot_type, *plot_vars[1:],
+                                              cache_key=(store_path, get_dataset_version(store_path)))
+            save_plot(PLOT_FOLDER, key, render_png(fig))
+        plot_url = url_for('plot_image', key=key, fmt='png')
 
     return render_template('eda.html', columns=columns, plot_types=list(plot_var_counts.keys()),
-                           plot_type=plot_type, var1=var1, var2=var2, var_count=var_count, plot_data=plot_data)
+                           plot_type=plot_type, var1=var1, var2=var2, var_count=var_count, plot_url=plot_url)
+
+
+@app.route('/plot/<key>.<fmt>')
+def plot_image(key, fmt):
+    plot_path = load_plot(PLOT_FOLDER, key, fmt) if is_plot_key(key) and fmt in PLOT_FORMATS else None
+    if plot_path is None:
+        return "Plot Not Found", 404
+
+    # Images never Change for a Key, so Browsers can Cache them
+    return send_file(plot_path, mimetype=PLOT_FORMATS[fmt], etag=key, max_age=PLOT_MAX_AGE, conditional=True)
 
 @app.route('/download')
 def download_data():
-    df, error, _ = get_uploaded_dataframe()
+    # Exports are Streamed from the Dataset Store, a Record Batch at a Time
+    store_path, error, _ = get_uploaded_store()
     if error:
-        return redirect(url_for('upload_file'))
-    
-    fmt = request.args.get('format', 'csv').lower() 
-    if fmt == 'csv':
-        # Convert df to CSV and Send
-        csv_data = df.to_csv(index=False)
-        return send_file(io.BytesIO(csv_data.encode()), mimetype='text/csv', as_attachment=True, download_name='DataGlimpse.csv')
-    
+        return error
+
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt in ('csv', 'csv_gzip', 'csv_zstd'):
+        # Optionally Compressed as it Streams (gzip or zstd)
+        compression = request.args.get('compression') or fmt.partition('_')[2]
+        if compression not in CSV_COMPRESSIONS:
+            compression = None
+        download_name = f'DataGlimpse.csv{CSV_COMPRESSIONS.get(compression, "")}'
+        response = app.response_class(compress_chunks(timed_chunks(iter_csv(store_path), 'serialise'), compression),
+                                      mimetype='application/octet-stream' if compression else 'text/csv')
+        return as_attachment(response, download_name)
+
+    elif fmt == 'parquet':
+        response = app.response_class(timed_chunks(iter_parquet(store_path), 'serialise'),
+                                      mimetype='application/vnd.apache.parquet')
+        return as_attachment(response, 'DataGlimpse.parquet')
+
+    elif fmt == 'feather':
+        response = app.response_class(timed_chunks(iter_feather(store_path), 'serialise'),
+                                      mimetype='application/vnd.apache.arrow.file')
+        return as_attachment(response, 'DataGlimpse.feather')
+
     elif fmt == 'db':
-        # Write df to a Temporary SQLite File
-        temp_db_path = os.path.join(UPLOAD_FOLDER, 'temp_download.db')
-        
-        # Remove Old Temp File if exists
-        if os.path.exists(temp_db_path):
-            os.remove(temp_db_path)
-        
-        # Save to SQLite and Send
-        conn = sqlite3.connect(temp_db_path)
-        df.to_sql('data', conn, index=False, if_exists='replace')
-        conn.close()
-        return send_file(temp_db_path, mimetype='application/x-sqlite3', as_attachment=True,download_name='DataGlimpse.db')
-    
+        # Write to a SQLite File for this Request Only, Removed (once Opened) so it goes when Sent
+        with span('serialise'):
+            db_path = write_sqlite(store_path, UPLOAD_FOLDER)
+        db_file = open(db_path, 'rb')
+        os.remove(db_path)
+        return send_file(db_file, mimetype='application/x-sqlite3', as_attachment=True, download_name='DataGlimpse.db')
+
     # Obtain Data Transformation Logs
     elif fmt == 'log_txt':
-        log_path = os.path.join(UPLOAD_FOLDER, 'edit_logs.txt')
-        if not os.path.exists(log_path):
+        plan = get_current_plan(store_path)
+        if not plan:
             return "No logs available", 404
-        
-        return send_file(log_path, mimetype='text/plain', as_attachment=True, download_name='Data_Transformation.txt')
-    
+
+        script = get_edit_script(plan)
+        return send_file(io.BytesIO(script.encode()), mimetype='text/plain', as_attachment=True, download_name='Data_Transformation.txt')
+
     else:
         return "Unsupported Download Format", 400
-    
+
+
+def as_attachment(response, download_name):
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return response
+
 
 if __name__ == '__main__':
+    # Clear Data in Temporary Folder (under gunicorn, gunicorn.conf.py does this before Starting Workers)
+    clear_upload_folder(UPLOAD_FOLDER)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import json
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from sketch_functions import HyperLogLog
+from storage_functions import get_index_path, get_file_signature, table_to_dataframe, get_tmp_path
+from profile_functions import SKETCH_ROWS
+from metrics_functions import count_cache
+
+# Characters of Text Minimums and Maximums Kept in the Index
+MAX_TEXT_LENGTH = 100
+
+
+def get_json_value(value):
+    # Index Values are Stored as JSON
+    value = value.as_py()
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)[:MAX_TEXT_LENGTH]
+
+
+def count_distinct(values):
+    # Exact for most Columns, Estimated (HyperLogLog) for Columns with more Rows than are Profiled Exactly
+    if len(values) <= SKETCH_ROWS:
+        return int(pc.count_distinct(values, mode='only_valid').as_py()), False
+    distinct = HyperLogLog()
+    for chunk in values.chunks:
+        distinct.update(chunk.to_numpy(zero_copy_only=False))
+    return min(distinct.count(), len(values) - values.null_count), True
+
+
+def get_column_dtype(table, name):
+    # Load only a Null (if any), as Integers and Booleans with Nulls Load as Floats and Objects
+    sample = table.select([name])
+    if table.column(name).null_count:
+        return str(table_to_dataframe(sample.filter(pc.is_null(table.column(name))).slice(0, 1))[name].dtype)
+    return str(table_to_dataframe(sample.slice(0, 0))[name].dtype)
+
+
+def build_column_metadata(table, name):
+    # Type, Null and Distinct Counts, Range and Bytes of one Column, as the Edit, EDA and Summary Pages Show them
+    values = table.column(name)
+    if pa.types.is_dictionary(values.type):
+        values = values.cast(values.type.value_type)
+    num_unique, approximate = count_distinct(values)
+
+    metadata = {
+        'dtype': get_column_dtype(table, name),
+        'null_count': values.null_count,
+        'num_unique': num_unique,
+        'approximate': approximate,
+        'min': None,
+        'max': None,
+        'bytes': table.column(name).nbytes,
+    }
+    if values.null_count < len(values) and not pa.types.is_null(values.type):
+        min_max = pc.min_max(values)
+        metadata['min'], metadata['max'] = get_json_value(min_max['min']), get_json_value(min_max['max'])
+    return metadata
+
+
+def build_column_index(table):
+    return {name: build_column_metadata(table, name) for name in table.column_names}
+
+
+def update_column_index(index, table, plan):
+    # Follow the Edit's Operations, Rescanning only Columns it Changed (every Column, if it Dropped Rows)
+    index = dict(index)
+    changed = set()
+    for op in plan:
+        if op.get('dropped_rows'):
+            changed.update(table.column_names)
+        elif op['op'] == 'drop_columns':
+            for col in op['columns']:
+                index.pop(col, None)
+        elif op['op'] == 'convert':
+            changed.add(op['column'])
+        elif op['op'] == 'rename':
+            index = {op['columns'].get(name, name): metadata for name, metadata in index.items()}
+            changed = {op['columns'].get(name, name) for name in changed}
+
+    return {name: index[name] if name in index and name not in changed else build_column_metadata(table, name)
+            for name in table.column_names}
+
+
+def load_column_index(store_path):
+    # Index of the Stored Dataset, if it was Built for this Version of it
+    index_path = get_index_path(store_path)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, encoding='utf-8') as f:
+        saved = json.load(f)
+    return saved['columns'] if saved['version'] == '-'.join(map(str, get_file_signature(store_path))) else None
+
+
+def save_column_index(store_path, index):
+    saved = {'version': '-'.join(map(str, get_file_signature(store_path))), 'columns': index}
+    tmp_path = get_tmp_path(get_index_path(store_path))
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(saved, f)
+    os.replace(tmp_path, get_index_path(store_path))
+
+
+def get_column_index(store_path):
+    # Built at Ingest and Updated by each Edit, so only Rebuilt if Missing (e.g. the Store was Copied, not Linked)
+    index = load_column_index(store_path)
+    count_cache('column_index', index is not None)
+    if index is None:
+        index = build_column_index(feather.read_table(store_path, memory_map=True))
+        save_column_index(store_path, index)
+    return index
@@ -0,0 +1,254 @@
+import re
+import sys
+import json
+import time
+import sqlite3
+import resource
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# Upper Bounds of the Histogram Buckets, for Durations (Seconds) and Peak Memory (Bytes)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BYTES_BUCKETS = tuple(2 ** n * 1024 ** 2 for n in range(6, 15))
+# Most Rows of a Dataset Labelled Small, then Medium (Larger ones are Large)
+DATASET_SIZES = ((100_000, 'small'), (10_000_000, 'medium'))
+
+METRIC_HELP = {
+    'dataglimpse_stage_seconds': 'Time spent in each stage (parse, profile, summarise, plot, rasterise, render, serialise, edit, commit, job).',
+    'dataglimpse_request_seconds': 'Time to serve each request, until its response was sent.',
+    'dataglimpse_request_peak_rss_bytes': 'Peak resident memory of the serving process during each request.',
+    'dataglimpse_cache_requests_total': 'Cache lookups, by cache and whether they hit.',
+}
+
+# Metrics this Process Recorded since it Last Flushed them, keyed by (Name, Labels) -> [Count, Sum, Bucket Counts]
+_pending = {}
+# Held while _pending is Read or Changed, as Requests are Served (and Jobs Polled) on Several Threads
+_pending_lock = threading.Lock()
+# Labels of the Current Request or Job (e.g. its Dataset Size), Added to its Spans
+_context_labels = contextvars.ContextVar('context_labels', default={})
+# Spans Timed in the Current Request, for its Timing Footer
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def get_size_label(num_rows):
+    return next((label for max_rows, label in DATASET_SIZES if num_rows <= max_rows), 'large')
+
+
+def set_context_labels(**labels):
+    _context_labels.set({**_context_labels.get(), **labels})
+
+
+def get_context_labels():
+    return dict(_context_labels.get())
+
+
+def start_request():
+    _context_labels.set({})
+    _request_spans.set([])
+
+
+def get_request_spans():
+    return _request_spans.get() or []
+
+
+def observe(name, value, buckets=SECONDS_BUCKETS, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    # Buckets are Counted Singly, and Made Cumulative on Export
+    position = next((i for i, bound in enumerate(buckets) if value <= bound), None)
+    with _pending_lock:
+        entry = _pending.setdefault(key, [0, 0.0, [0] * len(buckets)])
+        entry[0] += 1
+        entry[1] += value
+        if position is not None:
+            entry[2][position] += 1
+
+
+def increment(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _pending_lock:
+        entry = _pending.setdefault(key, [0, 0.0, None])
+        entry[0] += amount
+
+
+def count_cache(cache, hit):
+    increment('dataglimpse_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def record_span(stage, seconds):
+    # A Stage, Labelled with the Current Request's (or Job's) Labels
+    observe('dataglimpse_stage_seconds', seconds, stage=stage, **get_context_labels())
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - started)
+
+
+def timed(stage):
+    # Decorator Timing every Call of a Function as a Stage
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_chunks(chunks, stage):
+    # Streamed Responses are Produced as they are Sent, so Time each Chunk and Record the Total at the End
+    seconds = 0.0
+    chunks = iter(chunks)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - started
+            yield chunk
+    finally:
+        record_span(stage, seconds)
+
+
+def reset_peak_rss(pids=('self',)):
+    # Linux Only: Restart the Peak (VmHWM) Count of Processes
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/clear_refs', 'w') as f:
+                f.write('5')
+        except OSError:
+            pass
+
+
+def read_peak_rss(pid='self'):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            match = re.search(r'^VmHWM:\s+(\d+) kB', f.read(), re.MULTILINE)
+    except OSError:
+        match = None
+    if match:
+        return int(match.group(1)) * 1024
+    # Elsewhere only this Process' Peak since it Started is Known (in Kilobytes on Linux, Bytes on macOS)
+    if pid == 'self':
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+def clear_pending_metrics():
+    # Forked Processes Inherit their Parent's Pending Metrics, which the Parent will Flush Itself
+    with _pending_lock:
+        _pending.clear()
+
+
+def take_pending_metrics():
+    with _pending_lock:
+        pending = [[name, list(labels), *entry] for (name, labels), entry in _pending.items()]
+        _pending.clear()
+    return pending
+
+
+def merge_metrics(pending):
+    # Add Metrics Recorded by Another Process (e.g. a Task of a Job) to this Process' Pending ones
+    with _pending_lock:
+        for name, labels, count, total, buckets in pending:
+            key = (name, tuple(tuple(label) for label in labels))
+            entry = _pending.setdefault(key, [0, 0.0, [0] * len(buckets) if buckets is not None else None])
+            entry[0] += count
+            entry[1] += total
+            if buckets is not None:
+                entry[2] = [a + b for a, b in zip(entry[2], buckets)]
+
+
+def run_measured(func, *args):
+    # Run a Task in a Pool Process, Returning its Result with the Metrics it Recorded
+    clear_pending_metrics()
+    return func(*args), take_pending_metrics()
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metrics (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            count REAL NOT NULL,
+            sum REAL NOT NULL,
+            buckets TEXT,
+            PRIMARY KEY (name, labels)
+        )
+    """)
+    return conn
+
+
+def flush_metrics(db_path):
+    # Add this Process' Pending Metrics to the Totals Shared by all Workers and Jobs
+    pending = take_pending_metrics()
+    if not pending:
+        return
+    with connect(db_path) as conn:
+        # Totals are Read then Written Back, so Take the Write Lock First, or Concurrent Flushes Lose Increments
+        conn.execute('BEGIN IMMEDIATE')
+        for name, labels, count, total, buckets in pending:
+            labels = json.dumps(labels)
+            row = conn.execute("SELECT count, sum, buckets FROM metrics WHERE name = ? AND labels = ?",
+                               (name, labels)).fetchone()
+            if row is not None:
+                count += row[0]
+                total += row[1]
+                if buckets is not None:
+                    buckets = [a + b for a, b in zip(json.loads(row[2]), buckets)]
+            conn.execute("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?)",
+                         (name, labels, count, total, json.dumps(buckets) if buckets is not None else None))
+    conn.close()
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels, **extra):
+    labels = {**dict(labels), **extra}
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def export_metrics(db_path):
+    # Prometheus Text Format
+    with connect(db_path) as conn:
+        rows = conn.execute("SELECT name, labels, count, sum, buckets FROM metrics ORDER BY name, labels").fetchall()
+    conn.close()
+
+    lines = []
+    for i, (name, labels, count, total, buckets) in enumerate(rows):
+        labels = json.loads(labels)
+        if i == 0 or rows[i - 1][0] != name:
+            lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} {"counter" if buckets is None else "histogram"}')
+        if buckets is None:
+            lines.append(f'{name}{format_labels(labels)} {format_number(count)}')
+            continue
+
+        bounds = BYTES_BUCKETS if name.endswith('_bytes') else SECONDS_BUCKETS
+        cumulative = 0
+        for bound, bucket_count in zip(bounds, json.loads(buckets)):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{format_labels(labels, le=format_number(bound))} {format_number(cumulative)}')
+        lines.append(f'{name}_bucket{format_labels(labels, le="+Inf")} {format_number(count)}')
+        lines.append(f'{name}_sum{format_labels(labels)} {format_number(total)}')
+        lines.append(f'{name}_count{format_labels(labels)} {format_number(count)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,178 @@
+import os
+import json
+import bisect
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from storage_functions import get_sort_folder, get_file_signature, table_to_dataframe, get_tmp_path
+from stream_functions import ChunkSink
+
+# Row Offsets of each Record Batch, keyed by Store Path -> (File Signature, Offsets)
+_batch_offsets = {}
+
+
+def open_store(store_path):
+    # Memory-Mapped Reader, with the Row Offset where each Record Batch Starts (and the Total Row Count Last)
+    reader = pa.ipc.open_file(pa.memory_map(store_path))
+    signature = get_file_signature(store_path)
+    cached = _batch_offsets.get(store_path)
+    if cached is None or cached[0] != signature:
+        num_rows = [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+        cached = (signature, np.concatenate([[0], np.cumsum(num_rows, dtype=np.int64)]))
+        _batch_offsets[store_path] = cached
+    return reader, cached[1]
+
+
+def get_store_columns(store_path):
+    return pa.ipc.open_file(pa.memory_map(store_path)).schema.names
+
+
+def count_rows(store_path):
+    return int(open_store(store_path)[1][-1])
+
+
+def read_rows(store_path, positions, columns=None):
+    return table_to_dataframe(read_table_rows(store_path, positions, columns))
+
+
+def read_table_rows(store_path, positions, columns=None):
+    # Read only the Given Rows (in the Given Order) of the Given Columns, from the Record Batches that Hold them
+    reader, offsets = open_store(store_path)
+    columns = reader.schema.names if columns is None else columns
+    positions = np.asarray(positions, dtype=np.int64)
+    batch_ids = np.searchsorted(offsets, positions, side='right') - 1
+    order = np.argsort(batch_ids, kind='stable')
+
+    tables = []
+    for batch_id in np.unique(batch_ids):
+        local_positions = positions[batch_ids == batch_id] - offsets[batch_id]
+        tables.append(pa.Table.from_batches([reader.get_batch(batch_id).select(columns).take(local_positions)]))
+    table = pa.concat_tables(tables) if tables else reader.schema.empty_table().select(columns)
+    table = table.replace_schema_metadata(reader.schema.metadata)
+
+    # Rows were Gathered Batch by Batch, Restore the Requested Order
+    return table.take(np.argsort(order))
+
+
+def iter_columns_json(df, **fields):
+    # Columnar JSON ({..fields, "columns": [...], "data": {column: [values]}}), Encoded a Column at a Time
+    header = json.dumps({**fields, 'columns': list(df.columns)})
+    yield f'{header[:-1]}, "data": {{'.encode()
+    for i, col in enumerate(df.columns):
+        values = json.dumps(get_json_values(df[col]), allow_nan=False)
+        yield f'{", " if i else ""}{json.dumps(col)}: {values}'.encode()
+    yield b'}}'
+
+
+def get_json_values(series):
+    # Numbers and Booleans as they are, Everything else as Displayed in the Table, Missing Values as null
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        values = series.astype(object).tolist()
+    else:
+        values = series.astype(str).tolist()
+    return [None if missing else value for value, missing in zip(values, series.isna().tolist())]
+
+
+def iter_table_ipc(table):
+    # Arrow IPC Stream, Yielded a Record Batch at a Time
+    sink = ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), table.schema) as writer:
+        for batch in table.to_batches():
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def get_sort_path(store_path, column, kind):
+    signature = '-'.join(map(str, get_file_signature(store_path)))
+    column_key = hashlib.sha256(column.encode()).hexdigest()[:16]
+    return os.path.join(get_sort_folder(store_path), f'{signature}.{column_key}.{kind}.npy')
+
+
+def read_column(store_path, column):
+    # Memory-Mapped and Uncompressed, so only Touched Values are Read
+    return pa.ipc.open_file(pa.memory_map(store_path)).read_all().column(column)
+
+
+def get_value_type(values):
+    return values.type.value_type if pa.types.is_dictionary(values.type) else values.type
+
+
+def build_sort_index(store_path, column, progress=None):
+    # Row Order Sorting the Column (Nulls Last), and each Row's Rank in it, Saved per Dataset Version
+    order_path = get_sort_path(store_path, column, 'order')
+    if os.path.exists(order_path):
+        return order_path
+
+    sort_folder = get_sort_folder(store_path)
+    os.makedirs(sort_folder, exist_ok=True)
+    values = read_column(store_path, column)
+    order = pc.sort_indices(values.cast(get_value_type(values))).to_numpy()
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    for kind, positions in (('rank', rank), ('order', order)):
+        sort_path = get_sort_path(store_path, column, kind)
+        tmp_path = get_tmp_path(sort_path, '.tmp.npy')
+        np.save(tmp_path, positions)
+        os.replace(tmp_path, sort_path)
+
+    # Indexes of Older Versions are no longer Needed
+    signature = os.path.basename(order_path).split('.')[0]
+    for entry in os.scandir(sort_folder):
+        if not entry.name.startswith(f'{signature}.'):
+            os.remove(entry.path)
+    return order_path
+
+
+def load_sort_index(store_path, column, kind):
+    sort_path = get_sort_path(store_path, column, kind)
+    return np.load(sort_path, mmap_mode='r') if os.path.exists(sort_path) else None
+
+
+def find_equal_rows(store_path, column, value):
+    # Binary Search the Sorted Order for Rows Equal to value (Compared as the Column's Type)
+    values = read_column(store_path, column)
+    try:
+        value = pc.cast(pa.scalar(value), get_value_type(values)).as_py()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return np.empty(0, dtype=np.int64)
+
+    order = load_sort_index(store_path, column, 'order')
+    num_valid = len(values) - values.null_count
+    get_value = lambda i: values[int(order[i])].as_py()
+    start = bisect.bisect_left(range(num_valid), value, key=get_value)
+    stop = bisect.bisect_right(range(num_valid), value, key=get_value)
+    return np.sort(order[start:stop])
+
+
+def count_valid(store_path, column):
+    values = read_column(store_path, column)
+    return len(values) - values.null_count
+
+
+def get_page_rows(store_path, start, stop, sort=None, descending=False, filter_column=None, filter_value=None):
+    # Positions of the Rows on a Page, and the Number of Rows being Paged Through
+    # Descending Order Reverses the Valid Values, Keeping Nulls Last
+    if filter_column is not None:
+        rows = find_equal_rows(store_path, filter_column, filter_value)
+        if sort is not None:
+            rank = load_sort_index(store_path, sort, 'rank')
+            rows = rows[np.argsort(rank[rows], kind='stable')]
+            if descending:
+                num_valid = np.count_nonzero(rank[rows] < count_valid(store_path, sort))
+                rows = np.concatenate([rows[:num_valid][::-1], rows[num_valid:]])
+        return rows[start:stop], len(rows)
+
+    num_rows = count_rows(store_path)
+    positions = np.arange(start, min(stop, num_rows))
+    if sort is None:
+        return positions, num_rows
+
+    # Only the Page's Slice of the Sorted Order is Read
+    if descending:
+        num_valid = count_valid(store_path, sort)
+        positions = np.where(positions < num_valid, num_valid - 1 - positions, positions)
+    return np.asarray(load_sort_index(store_path, sort, 'order')[positions]), num_rows
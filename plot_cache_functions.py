@@ -0,0 +1,73 @@
+import os
+import io
+import hashlib
+from metrics_functions import timed, count_cache
+from storage_functions import get_tmp_path
+
+# Folder of Rendered Plots, Shared by all Workers
+PLOT_FOLDER = os.path.join('temp', 'plots')
+# Rendered Plots Kept on Disk (Least Recently Used are Evicted Past this)
+PLOT_CACHE_BYTES = 200 * 1024 * 1024
+# Image Formats Plots are Rendered in -> Mimetype
+PLOT_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def get_plot_key(*spec):
+    # Same Dataset Version and Plot Spec gives the Same Key (and Image)
+    return hashlib.sha256(repr(spec).encode()).hexdigest()[:32]
+
+
+def is_plot_key(key):
+    return len(key) == 32 and all(c in '0123456789abcdef' for c in key)
+
+
+def get_plot_path(plot_folder, key, fmt='png'):
+    return os.path.join(plot_folder, f'{key}.{fmt}')
+
+
+@timed('rasterise')
+def render_png(fig):
+    img = io.BytesIO()
+    fig.savefig(img, format='png')
+    return img.getvalue()
+
+
+def load_plot(plot_folder, key, fmt='png'):
+    plot_path = get_plot_path(plot_folder, key, fmt)
+    try:
+        # Touch so Recently Viewed Plots are Evicted Last
+        os.utime(plot_path)
+    except FileNotFoundError:
+        count_cache('plot', False)
+        return None
+    count_cache('plot', True)
+    return plot_path
+
+
+def save_plot(plot_folder, key, image_bytes, fmt='png'):
+    os.makedirs(plot_folder, exist_ok=True)
+    plot_path = get_plot_path(plot_folder, key, fmt)
+    tmp_path = get_tmp_path(plot_path)
+    with open(tmp_path, 'wb') as f:
+        f.write(image_bytes)
+    os.replace(tmp_path, plot_path)
+    evict_plots(plot_folder)
+    return plot_path
+
+
+def evict_plots(plot_folder, max_bytes=PLOT_CACHE_BYTES):
+    extensions = tuple(f'.{fmt}' for fmt in PLOT_FORMATS)
+    entries = [entry for entry in os.scandir(plot_folder) if entry.name.endswith(extensions)]
+    total_bytes = sum(entry.stat().st_size for entry in entries)
+    if total_bytes <= max_bytes:
+        return
+
+    # Remove Least Recently Used Plots until Under Budget
+    for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            total_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
@@ -1,113 +1,106 @@
 import numpy as np
 import pandas as pd
 import matplotlib.dates as mdates
+from matplotlib import cbook, mlab
+from matplotlib.colors import LogNorm
 from matplotlib.figure import Figure
+from inference_functions import infer_column_type, should_coerce, parse_dates
+from metrics_functions import timed
+from aggregation_functions import TOP_CATEGORIES, count_categories, count_pairs, get_cached_counts
 
-def get_plot(data, var1, plot_type, var2=None):
-    # Prepare Data
-    if var2 is not None:
-        df = data[[var1, var2]].dropna()
-        x = df[var1]
-        y = df[var2]
-    else:
-        x = data[var1].dropna()
-        y = None
+# Above this many Points, Plots are Drawn from Binned Aggregates (Sized to the Figure) instead of every Row
+LOD_POINTS = 10_000
+# Screen Pixels per Bin (Scatter Density) or per Bucket (Line)
+SCATTER_BIN_PIXELS = 4
+LINE_BUCKET_PIXELS = 2
+# Outliers Drawn per Box
+MAX_FLIERS = 200
+# Histogram Bins a Large Group is Reduced to before Estimating its Violin Density
+KDE_BINS = 512
+# Fraction of a Heatmap Axis' Values that must Convert to Numbers for it to be Treated as Numeric
+HEATMAP_NUMERIC_FRACTION = 0.75
 
-    # Coerce Numeric Columns to Numeric (If Not Already)
-    if plot_type in ['histogram', 'density', 'boxplot', 'scatter']:
-        x = pd.to_numeric(x, errors='coerce')
-    if y is not None and plot_type in ['violin', 'scatter', 'line']:
-        y = pd.to_numeric(y, errors='coerce')
-    # For Heatmap, if more than 75% of values can be converted to numeric, treat it as numeric
-    if plot_type in ['heatmap']:
-        coerced_x = pd.to_numeric(x, errors='coerce')
-        if coerced_x.notna().sum() / len(x) >= 0.75:
-            x = coerced_x.dropna()
-        coerced_y = pd.to_numeric(y, errors='coerce')
-        if coerced_y.notna().sum() / len(y) >= 0.75:
-            y = coerced_y.dropna()
-    
-    # Coerce DateTime Columns to DateTime (If Not Already)
-    if plot_type == 'line':
-        coerced_x = pd.to_datetime(x, errors='coerce', infer_datetime_format=True)
-        if coerced_x.notna().sum() / len(x) >= 0.75:
-            x = coerced_x.dropna()
+@timed('plot')
+def get_plot(data, var1, plot_type, var2=None, cache_key=None):
+    # Categorical Plots are Drawn from Counts of their Top Categories (Cached per Dataset Version and Columns),
+    # so their Size does not Grow with the Number of Categories
+    if plot_type in TOP_CATEGORIES:
+        spec = (*cache_key, plot_type, var1, var2) if cache_key is not None else None
+        counts = get_cached_counts(spec, lambda: get_category_counts(data, var1, plot_type, var2))
+        return draw_counts(counts, var1, plot_type, var2)
+
+    df, x, y = prepare_plot_data(data, var1, plot_type, var2)
 
     # Dynamic Graph Size (Depending on Number of Categorical Points)
     x_unique = len(x.unique()) if not pd.api.types.is_numeric_dtype(x) else 1
     y_unique = len(y.unique()) if (y is not None and not pd.api.types.is_numeric_dtype(y)) else 1
-    width = max(6, min(20, x_unique * 0.6))
-    height = max(4, min(15, y_unique * 0.5))
-    if x_unique == 1 and y_unique != 1:
-        width = height * 1.5
-    elif y_unique == 1 and x_unique != 1:
-        height = width / 1.5
-    fig = Figure(figsize=(width, height))
-    ax = fig.subplots()
+    fig, width, height = create_figure(x_unique, y_unique)
+    ax = fig.axes[0]
 
     if plot_type == 'histogram':
-        ax.hist(x, bins=30, color='blue', alpha=0.7)
+        counts, edges = get_histogram(x, bins=30)
+        ax.hist(edges[:-1], edges, weights=counts, color='blue', alpha=0.7)
         ax.set_title(f'Histogram of {var1}')
         ax.set_xlabel(var1)
         ax.set_ylabel('Frequency')
 
     elif plot_type == 'density':
-        counts, bins, _ = ax.hist(x, bins=50, density=True, alpha=0.0)
+        counts, bins = get_histogram(x, bins=50, density=True)
         bin_centers = 0.5 * (bins[:-1] + bins[1:])
         ax.plot(bin_centers, counts, color='purple')
         ax.set_title(f'Density Plot of {var1}')
         ax.set_xlabel(var1)
         ax.set_ylabel('Density')
 
-    elif plot_type == 'barchart':
-        counts = x.value_counts()
-        ax.bar(counts.index.astype(str), counts.values, color='green', alpha=0.7)
-        ax.set_title(f'Bar Chart of {var1}')
-        ax.set_xlabel(var1)
-        ax.set_ylabel('Count')
-        ax.tick_params(axis='x', rotation=45)
-
-    elif plot_type == 'piechart':
-        counts = x.value_counts()
-        ax.pie(counts.values, labels=counts.index.astype(str), autopct='%1.1f%%')
-        ax.set_title(f'Pie Chart of {var1}')
-
     elif plot_type == 'boxplot':
         # Boxplot for 1 Numeric Var
         if var2 is None:
-            ax.boxplot(x.dropna(), vert=True)
+            ax.bxp(get_box_stats([x.dropna().to_numpy()]), vert=True)
             ax.set_title(f'Boxplot of {var1}')
             ax.set_ylabel(var1)
             ax.set_xticks([])
         # Boxplot for Numeric Var, across Categories
         else:
-            grouped = [x[y == cat].dropna() for cat in y.dropna().unique()]
-            ax.boxplot(grouped, labels=y.dropna().unique())
+            grouped = group_values(x, y)
+            ax.bxp(get_box_stats(list(grouped.values()), labels=list(grouped.keys())))
             ax.set_title(f'Boxplot of {var1} by {var2}')
             ax.set_xlabel(var2)
             ax.set_ylabel(var1)
             ax.tick_params(axis='x', rotation=45)
 
     elif plot_type == 'violin':
-        grouped = [y[x == cat] for cat in x.unique()]
-        ax.violinplot(grouped, showmeans=False, showmedians=True)
+        grouped = group_values(y, x)
+        ax.violin(cbook.violin_stats(list(grouped.values()), estimate_density), showmeans=False, showmedians=True)
         ax.set_xticks(range(1, len(grouped) + 1))
-        ax.set_xticklabels(x.unique())
+        ax.set_xticklabels(list(grouped.keys()))
         ax.set_title(f'Violin Plot of {var2} by {var1}')
         ax.set_xlabel(var1)
         ax.set_ylabel(var2)
         ax.tick_params(axis='x', rotation=45)
 
     elif plot_type == 'scatter':
-        ax.scatter(x, y, alpha=0.7)
+        if len(x) > LOD_POINTS:
+            # Too many Points to Draw, Show how Densely they Fall on each Screen Bin instead
+            bins = (int(width * fig.dpi / SCATTER_BIN_PIXELS), int(height * fig.dpi / SCATTER_BIN_PIXELS))
+            counts, x_edges, y_edges = get_histogram_2d(x, y, bins)
+            mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap='Blues', norm=LogNorm())
+            fig.colorbar(mesh, ax=ax, label='Points')
+        else:
+            ax.scatter(x, y, alpha=0.7)
         ax.set_title(f'Scatter Plot of {var1} vs {var2}')
         ax.set_xlabel(var1)
         ax.set_ylabel(var2)
 
     elif plot_type == 'line':
         grouped = df.groupby(x)[var2].mean()
-        x_vals = grouped.index
-        y_vals = grouped.values
+        buckets = int(width * fig.dpi / LINE_BUCKET_PIXELS)
+        if len(grouped) > max(buckets, LOD_POINTS) and is_continuous(grouped.index):
+            # More Points than Pixels, Draw the Mean of each Bucket with its Min/Max Range
+            x_vals, y_min, y_vals, y_max = bucket_line(grouped.dropna(), buckets)
+            ax.fill_between(x_vals, y_min, y_max, alpha=0.3)
+        else:
+            x_vals = grouped.index
+            y_vals = grouped.values
         ax.plot(x_vals, y_vals)
         ax.set_title(f'Line Plot of {var2} by {var1}')
         ax.set_xlabel(var1)
@@ -118,41 +111,172 @@ def get_plot(data, var1, plot_type, var2=None):
         ax.tick_params(axis='x', rotation=45)
         
 
-    elif plot_type == 'heatmap':
-        if pd.api.types.is_numeric_dtype(y):
-            y_binned = pd.cut(y, bins=10)
-            y_labels = [f"{interval.left:.2f} - {interval.right:.2f}" for interval in y_binned.cat.categories]
-            pivot = pd.crosstab(y_binned, x)
-            im = ax.imshow(pivot, cmap='Blues')
-            fig.colorbar(im, ax=ax)
-            ax.set_xticks(np.arange(len(pivot.columns)))
-            ax.set_yticks(np.arange(len(pivot.index)))
-            ax.set_xticklabels(pivot.columns, rotation=45)
-            ax.set_yticklabels(y_labels)
-            ax.set_xlabel(var1)
-            ax.set_ylabel(var2)
-            ax.set_title(f'Heatmap of Binned {var2} vs {var1}')
+    else:
+        raise ValueError(f"Unsupported plot type: {plot_type}")
 
-        else:
-            pivot = pd.crosstab(y, x)
-            im = ax.imshow(pivot, cmap='Blues')
-            fig.colorbar(im, ax=ax)
-            ax.set_xticks(np.arange(len(pivot.columns)))
-            ax.set_yticks(np.arange(len(pivot.index)))
-            ax.set_xticklabels(pivot.columns, rotation=45)
-            ax.set_yticklabels(pivot.index)
-            ax.set_title(f'Heatmap of {var2} vs {var1}')
+    fig.tight_layout()
+    return fig
+
+
+def create_figure(x_unique, y_unique):
+    # Dynamic Graph Size (Depending on Number of Categorical Points)
+    width = max(6, min(20, x_unique * 0.6))
+    height = max(4, min(15, y_unique * 0.5))
+    if x_unique == 1 and y_unique != 1:
+        width = height * 1.5
+    elif y_unique == 1 and x_unique != 1:
+        height = width / 1.5
+    fig = Figure(figsize=(width, height))
+    fig.subplots()
+    return fig, width, height
+
+
+def get_category_counts(data, var1, plot_type, var2=None):
+    _, x, y = prepare_plot_data(data, var1, plot_type, var2)
+    if plot_type == 'heatmap':
+        return count_pairs(x, y, TOP_CATEGORIES[plot_type], bin_y=pd.api.types.is_numeric_dtype(y))
+    return count_categories(x, TOP_CATEGORIES[plot_type])
+
+
+def draw_counts(counts, var1, plot_type, var2=None):
+    fig, _, _ = create_figure(len(counts['x_labels']), len(counts['y_labels']) or 1)
+    ax = fig.axes[0]
 
+    if plot_type == 'barchart':
+        ax.bar(counts['x_labels'], counts['counts'], color='green', alpha=0.7)
+        ax.set_title(f'Bar Chart of {var1}')
         ax.set_xlabel(var1)
-        ax.set_ylabel(var2)
+        ax.set_ylabel('Count')
+        ax.tick_params(axis='x', rotation=45)
 
-    else:
-        raise ValueError(f"Unsupported plot type: {plot_type}")
+    elif plot_type == 'piechart':
+        ax.pie(counts['counts'], labels=counts['x_labels'], autopct='%1.1f%%')
+        ax.set_title(f'Pie Chart of {var1}')
+
+    elif plot_type == 'heatmap':
+        im = ax.imshow(counts['counts'], cmap='Blues')
+        fig.colorbar(im, ax=ax)
+        ax.set_xticks(np.arange(len(counts['x_labels'])))
+        ax.set_yticks(np.arange(len(counts['y_labels'])))
+        ax.set_xticklabels(counts['x_labels'], rotation=45)
+        ax.set_yticklabels(counts['y_labels'])
+        ax.set_xlabel(var1)
+        ax.set_ylabel(var2)
+        ax.set_title(f'Heatmap of Binned {var2} vs {var1}' if counts['y_binned'] else f'Heatmap of {var2} vs {var1}')
 
     fig.tight_layout()
     return fig
 
 
+def prepare_plot_data(data, var1, plot_type, var2=None):
+    # Prepare Data
+    if var2 is not None:
+        df = data[[var1, var2]].dropna()
+        x = df[var1]
+        y = df[var2]
+    else:
+        df = None
+        x = data[var1].dropna()
+        y = None
+
+    # Coerce Numeric Columns to Numeric (If Not Already)
+    if plot_type in ['histogram', 'density', 'boxplot', 'scatter']:
+        x = pd.to_numeric(x, errors='coerce')
+    if y is not None and plot_type in ['violin', 'scatter', 'line']:
+        y = pd.to_numeric(y, errors='coerce')
+    # For Heatmap, if more than 75% of values can be converted to numeric, treat it as numeric
+    if plot_type in ['heatmap']:
+        x = coerce_mostly_numeric(x)
+        y = coerce_mostly_numeric(y)
+    
+    # Coerce DateTime Columns to DateTime (If Not Already)
+    # (Only Text, and only if a Sample of it Parses, with the Format Detected from it)
+    if plot_type == 'line' and (x.dtype == 'object' or isinstance(x.dtype, pd.CategoricalDtype)):
+        x = x.astype(object)
+        inferred = infer_column_type(x)
+        if should_coerce(inferred, 'datetime', 75):
+            coerced_x = pd.Series(parse_dates(x, inferred['datetime_format']).to_numpy(), index=x.index)
+            if coerced_x.notna().sum() / len(x) >= 0.75:
+                x = coerced_x.dropna()
+
+    return df, x, y
+
+
+def coerce_mostly_numeric(values, weights=None):
+    # Numeric if Enough Values Convert (Weighted by how often each Occurs, if Given), Dropping those that do not
+    coerced = pd.to_numeric(values, errors='coerce')
+    present = coerced.notna().to_numpy()
+    converted = present.sum() if weights is None else weights[present].sum()
+    total = len(values) if weights is None else weights.sum()
+    return coerced[present] if converted / max(total, 1) >= HEATMAP_NUMERIC_FRACTION else values
+
+
+def get_histogram(values, bins, density=False):
+    values = values.dropna().to_numpy(dtype=np.float64)
+    return np.histogram(values, bins=bins, density=density)
+
+
+def get_histogram_2d(x, y, bins):
+    present = x.notna() & y.notna()
+    return np.histogram2d(x[present].to_numpy(dtype=np.float64), y[present].to_numpy(dtype=np.float64), bins=bins)
+
+
+def group_values(values, groups):
+    # One Groupby for all Categories (in Order of Appearance), rather than a Mask per Category
+    return {cat: group.dropna().to_numpy(dtype=np.float64)
+            for cat, group in values.groupby(groups, sort=False, observed=True)}
+
+
+def get_box_stats(data, labels=None):
+    stats = cbook.boxplot_stats(data, labels=labels)
+
+    # Thin out Outliers, Keeping the most Extreme
+    for stat in stats:
+        fliers = np.sort(stat['fliers'])
+        if len(fliers) > MAX_FLIERS:
+            stat['fliers'] = fliers[np.linspace(0, len(fliers) - 1, MAX_FLIERS).astype(int)]
+    return stats
+
+
+def get_distribution(values, bins):
+    # Histogram and Box Stats of Numeric Values (without Missing Values)
+    counts, edges = np.histogram(values, bins=bins)
+    return counts, edges, get_box_stats([values], labels=[''])
+
+
+def estimate_density(values, coords):
+    # Gaussian KDE with Scott's Rule (as violinplot), Binned First for Large Groups
+    if len(values) <= LOD_POINTS:
+        return mlab.GaussianKDE(values).evaluate(coords)
+
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    if not bandwidth > 0:
+        return np.where(np.isclose(coords, values[0]), 1.0, 0.0)
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(coords[0] - 3 * bandwidth, coords[-1] + 3 * bandwidth))
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    kernel = np.exp(-0.5 * ((coords[:, None] - centers[None, :]) / bandwidth) ** 2)
+    return kernel @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+
+def is_continuous(index):
+    return pd.api.types.is_numeric_dtype(index) or pd.api.types.is_datetime64_any_dtype(index)
+
+
+def bucket_line(grouped, buckets):
+    # Split the (Sorted) x Range into Equal Width Buckets, then Reduce each Contiguous Bucket
+    positions = grouped.index.to_numpy().astype(np.float64)
+    span = positions[-1] - positions[0]
+    codes = np.minimum(((positions - positions[0]) / span * buckets).astype(np.int64), buckets - 1)
+    _, starts = np.unique(codes, return_index=True)
+
+    values = grouped.to_numpy(dtype=np.float64)
+    sizes = np.diff(np.append(starts, len(values)))
+    y_min = np.minimum.reduceat(values, starts)
+    y_mean = np.add.reduceat(values, starts) / sizes
+    y_max = np.maximum.reduceat(values, starts)
+    return grouped.index[starts], y_min, y_mean, y_max
+
+
 def format_linegraph_xaxis(ax, x_vals, max_labels=15):
     n = len(x_vals)
     step = max(1, n // max_labels)
@@ -0,0 +1,469 @@
+import numpy as np
+import pandas as pd
+from sketch_functions import HyperLogLog, KLLSketch, MisraGries
+from inference_functions import infer_column_type, should_coerce, parse_dates, is_text_dtype, SAMPLE_MARGIN
+
+# Thresholds for Conversion
+CATEGORY_THRESHOLD = 0.1
+NUMERIC_THRESHOLD = 95
+DATETIME_THRESHOLD = 95
+
+MISSING_VALUES = ['NONE', 'NIL', 'NA', 'NULL', 'N/A', '', ' ']
+TOP_K = 10
+# Fractions of Missing Values per Row to Count Rows Above
+ROW_MISSING_FRACTIONS = [0.1, 0.25, 0.5]
+# Rows Hashed at a Time when Looking for Duplicates
+DUPLICATE_CHUNK_SIZE = 100_000
+# Largest Duplicate Groups Kept in the Profile
+MAX_DUPLICATE_GROUPS = 5
+# Datasets with more Rows are Profiled with Sketches, unless Exact Statistics are Asked for
+SKETCH_ROWS = 10_000_000
+SKETCH_CHUNK_SIZE = 1_000_000
+HEAVY_HITTER_CAPACITY = 1000
+
+
+def count_missing_values(series, missing_values=MISSING_VALUES, codes=None, uniques=None):
+    # Only Text Columns can hold Missing Value Tokens
+    if not is_text_dtype(series.dtype):
+        return {}
+    if codes is None:
+        codes, uniques = pd.factorize(series)
+
+    # Normalise each Unique Value Once, then Count through the Codes
+    tokens = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.strip().str.upper()
+    is_missing = tokens.isin(missing_values).to_numpy()
+    if not is_missing.any():
+        return {}
+    counts = np.bincount(codes[codes >= 0], minlength=len(tokens))
+    token_counts = pd.Series(counts[is_missing]).groupby(tokens[is_missing].to_numpy()).sum()
+
+    # Get Number of "Missing Values"
+    return {value: int(token_counts[value]) for value in missing_values if token_counts.get(value, 0) > 0}
+
+
+def get_numeric_series(series, codes=None, uniques=None):
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+
+    # Coerce each Unique Value Once, then Map back through the Codes
+    if codes is None:
+        codes, uniques = pd.factorize(series)
+    numeric_uniques = pd.to_numeric(pd.Series(np.asarray(uniques, dtype=object)), errors='coerce').to_numpy(dtype='float64')
+    values = np.append(numeric_uniques, np.nan)[codes]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def get_numeric_stats(numeric_series):
+    q1, median, q3 = numeric_series.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {
+        'zero_count': int(numeric_series.eq(0).sum()),
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'mean': numeric_series.mean(),
+        'std': numeric_series.std(),
+        'min': numeric_series.min(),
+        'max': numeric_series.max(),
+        'outliers_count': int(numeric_series[(numeric_series < q1 - 1.5 * iqr) | (numeric_series > q3 + 1.5 * iqr)].count()),
+    }
+
+
+def get_datetime_stats(date_uniques):
+    # Extract Date and Time Separately
+    date_uniques = date_uniques.dropna()
+    dates = date_uniques.dt.date
+    times = date_uniques.dt.time
+    return {
+        'num_dates': dates.nunique(),
+        'min_date': dates.min(),
+        'max_date': dates.max(),
+        'min_time': times.min(),
+        'max_time': times.max(),
+    }
+
+
+def build_column_profile(series, missing_values=MISSING_VALUES, inferred=None):
+    length = len(series)
+    null_mask = series.isna()
+
+    # Factorize Once, Everything else Works on the Unique Values
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    value_counts = pd.Series(counts, index=uniques.to_numpy()).sort_values(ascending=False, kind='stable')
+    num_unique = len(uniques)
+
+    column_profile = {
+        'dtype': str(series.dtype),
+        'is_numeric': pd.api.types.is_numeric_dtype(series),
+        'length': length,
+        'null_mask': null_mask.to_numpy(),
+        'null_count': int(null_mask.sum()),
+        'num_unique': num_unique,
+        'missing': count_missing_values(series, missing_values, codes, uniques),
+        'top_values': value_counts.head(TOP_K).to_dict(),
+        'approximate': [],
+    }
+
+    # Constant and Binary Columns need nothing else
+    if num_unique <= 2:
+        return column_profile
+
+    # Test a Sample first, Coercing the Unique Values only if it Comes Close to a Threshold (else the Rate is Estimated)
+    if inferred is None:
+        inferred = infer_column_type(series)
+
+    # Numeric Parse Rate and Moments
+    if column_profile['is_numeric'] or should_coerce(inferred, 'numeric', NUMERIC_THRESHOLD):
+        numeric_series = get_numeric_series(series, codes, uniques.to_numpy())
+        column_profile['numeric_count'] = int(numeric_series.notna().sum())
+        numeric_percentage = round(column_profile['numeric_count'] / length * 100, 4)
+        if numeric_percentage >= NUMERIC_THRESHOLD or column_profile['is_numeric']:
+            column_profile['numeric'] = get_numeric_stats(numeric_series)
+    else:
+        column_profile['numeric_count'] = round(inferred['numeric_rate'] * length)
+        column_profile['approximate'].append('numeric_count')
+
+    # Categories of Low-Cardinality Columns
+    if (is_text_dtype(series.dtype) and num_unique / length <= CATEGORY_THRESHOLD) or series.dtype == 'category':
+        column_profile['categories'] = sorted(map(str, uniques))
+
+    # DateTime Parse Rate (with the Detected Format), Weighted by how often each Unique Value Occurs
+    if is_text_dtype(series.dtype) and should_coerce(inferred, 'datetime', DATETIME_THRESHOLD):
+        date_uniques = parse_dates(uniques, inferred['datetime_format'])
+        column_profile['datetime_count'] = int(counts[date_uniques.notna().to_numpy()].sum())
+        date_percentage = round(column_profile['datetime_count'] / length * 100, 4)
+        if date_percentage > DATETIME_THRESHOLD:
+            column_profile['datetime'] = get_datetime_stats(date_uniques)
+    elif is_text_dtype(series.dtype):
+        column_profile['datetime_count'] = round(inferred['datetime_rate'] * length)
+        column_profile['approximate'].append('datetime_count')
+
+    return column_profile
+
+
+def build_sketch_column_profile(series, missing_values=MISSING_VALUES, chunksize=SKETCH_CHUNK_SIZE, inferred=None):
+    if inferred is None:
+        inferred = infer_column_type(series)
+    chunks = (series.iloc[start:start + chunksize] for start in range(0, len(series), chunksize))
+    column_profile = build_chunked_column_profile(chunks, series.dtype, missing_values, inferred)
+    column_profile['null_mask'] = series.isna().to_numpy()
+    return column_profile
+
+
+def build_chunked_column_profile(chunks, dtype, missing_values, inferred):
+    # Sketch Profile of a Column Given as Chunks (of the given dtype), without ever Holding it Whole
+    return finish_column_sketch(sketch_chunks(chunks, dtype, missing_values, inferred), dtype, inferred)
+
+
+def sketch_chunks(chunks, dtype, missing_values, inferred):
+    # Each Chunk is Sketched on its Own, and Merged into the Sketch of the Chunks before it
+    sketch = None
+    for chunk in chunks:
+        chunk_sketch = sketch_chunk(chunk, dtype, missing_values, inferred)
+        sketch = chunk_sketch if sketch is None else merge_column_sketches(sketch, chunk_sketch)
+    if sketch is None:
+        sketch = sketch_chunk(pd.Series([], dtype=dtype), dtype, missing_values, inferred)
+    return sketch
+
+
+def get_sketch_coercions(dtype, inferred):
+    # Chunks are only Coerced if a Sample Comes Close to the Thresholds (else the Rates are Estimated)
+    coerce_numeric = pd.api.types.is_numeric_dtype(dtype) or should_coerce(inferred, 'numeric', NUMERIC_THRESHOLD)
+    coerce_datetime = is_text_dtype(dtype) and should_coerce(inferred, 'datetime', DATETIME_THRESHOLD)
+    return coerce_numeric, coerce_datetime
+
+
+def sketch_chunk(chunk, dtype, missing_values, inferred):
+    # Mergeable Sketches and Exact Running Totals of one Chunk of a Column (Chunks may be Sketched in Different
+    # Processes, then Merged with merge_column_sketches)
+    coerce_numeric, coerce_datetime = get_sketch_coercions(dtype, inferred)
+    distinct = HyperLogLog()
+    distinct.update(chunk)
+    heavy_hitters = MisraGries(HEAVY_HITTER_CAPACITY)
+    heavy_hitters.update(chunk.dropna())
+    quantiles = KLLSketch()
+    sketch = {
+        'length': len(chunk), 'null_count': int(chunk.isna().sum()),
+        'distinct': distinct, 'heavy_hitters': heavy_hitters, 'quantiles': quantiles,
+        'missing': count_missing_values(chunk, missing_values),
+        'numeric_count': 0, 'numeric_mean': 0.0, 'numeric_m2': 0.0, 'zero_count': 0,
+        'min': np.inf, 'max': -np.inf, 'datetime_count': 0, 'date_bounds': [],
+    }
+
+    numeric_chunk = get_numeric_series(chunk).dropna().to_numpy(dtype='float64') if coerce_numeric else []
+    if len(numeric_chunk):
+        quantiles.update(numeric_chunk)
+        mean = numeric_chunk.mean()
+        sketch.update({
+            'numeric_count': len(numeric_chunk), 'numeric_mean': mean, 'numeric_m2': ((numeric_chunk - mean) ** 2).sum(),
+            'zero_count': int((numeric_chunk == 0).sum()), 'min': numeric_chunk.min(), 'max': numeric_chunk.max(),
+        })
+
+    if coerce_datetime:
+        codes, uniques = pd.factorize(chunk)
+        date_uniques = parse_dates(uniques, inferred['datetime_format'])
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        sketch['datetime_count'] = int(counts[date_uniques.notna().to_numpy()].sum())
+        if date_uniques.notna().any():
+            sketch['date_bounds'] = [date_uniques.min(), date_uniques.max()]
+    return sketch
+
+
+def merge_column_sketches(sketch, other):
+    # Merges other into sketch (Sketches are Merged in Place), Returning it
+    for key in ('distinct', 'heavy_hitters', 'quantiles'):
+        sketch[key].merge(other[key])
+    for value, count in other['missing'].items():
+        sketch['missing'][value] = sketch['missing'].get(value, 0) + count
+    for key in ('length', 'null_count', 'zero_count', 'datetime_count'):
+        sketch[key] += other[key]
+    sketch['min'], sketch['max'] = min(sketch['min'], other['min']), max(sketch['max'], other['max'])
+    sketch['date_bounds'] += other['date_bounds']
+
+    # Combine Means and Sums of Squared Deviations (Chan et al.)
+    count, other_count = sketch['numeric_count'], other['numeric_count']
+    if other_count:
+        total = count + other_count
+        delta = other['numeric_mean'] - sketch['numeric_mean']
+        sketch['numeric_mean'] += delta * other_count / total
+        sketch['numeric_m2'] += other['numeric_m2'] + delta ** 2 * count * other_count / total
+        sketch['numeric_count'] = total
+    return sketch
+
+
+def finish_column_sketch(sketch, dtype, inferred):
+    # Column Profile from the Merged Sketch of all its Chunks
+    length, null_count = sketch['length'], sketch['null_count']
+    is_text = is_text_dtype(dtype)
+    coerce_numeric, coerce_datetime = get_sketch_coercions(dtype, inferred)
+    distinct, heavy_hitters, quantiles = sketch['distinct'], sketch['heavy_hitters'], sketch['quantiles']
+    numeric_count, datetime_count = sketch['numeric_count'], sketch['datetime_count']
+
+    # Every Value Fits in the Heavy Hitters when there are Few, so those Counts are Exact
+    num_unique = len(heavy_hitters.counters) if heavy_hitters.exact else min(distinct.count(), length - null_count)
+    approximate = [] if heavy_hitters.exact else ['num_unique', 'top_values', 'categories']
+    # Error Bounds of Sketched Values: Relative for the Distinct Count, in Rows for Counts, and the Range of Values
+    # within the Rank Error for Quantiles
+    errors = {} if heavy_hitters.exact else {'num_unique': distinct.relative_error(), 'top_values': heavy_hitters.error()}
+
+    column_profile = {
+        'dtype': str(dtype),
+        'is_numeric': pd.api.types.is_numeric_dtype(dtype),
+        'length': length,
+        'null_count': null_count,
+        'num_unique': num_unique,
+        'missing': sketch['missing'],
+        'top_values': heavy_hitters.top(TOP_K).to_dict(),
+        'approximate': approximate,
+        'errors': errors,
+    }
+
+    # Constant and Binary Columns need nothing else
+    if num_unique <= 2:
+        return column_profile
+
+    if not coerce_numeric:
+        numeric_count = round(inferred['numeric_rate'] * length)
+        approximate.append('numeric_count')
+    if is_text and not coerce_datetime:
+        datetime_count = round(inferred['datetime_rate'] * length)
+        approximate.append('datetime_count')
+
+    column_profile['numeric_count'] = numeric_count
+    numeric_percentage = round(numeric_count / length * 100, 4)
+    if numeric_percentage >= NUMERIC_THRESHOLD or column_profile['is_numeric']:
+        q1, median, q3 = quantiles.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        outliers_count = quantiles.rank(q1 - 1.5 * iqr) + quantiles.count - quantiles.rank(q3 + 1.5 * iqr, side='right')
+        column_profile['numeric'] = {
+            'zero_count': sketch['zero_count'],
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'mean': sketch['numeric_mean'] if numeric_count else np.nan,
+            'std': np.sqrt(sketch['numeric_m2'] / (numeric_count - 1)) if numeric_count > 1 else np.nan,
+            'min': sketch['min'] if numeric_count else np.nan,
+            'max': sketch['max'] if numeric_count else np.nan,
+            'outliers_count': outliers_count,
+        }
+        approximate += ['q1', 'median', 'q3', 'outliers_count']
+        rank_error = quantiles.rank_error()
+        for key, fraction in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+            errors[key] = quantiles.quantiles([max(fraction - rank_error, 0), min(fraction + rank_error, 1)])
+        # Each of the two Ranks Bounding the Outliers may be Off by the Rank Error
+        errors['outliers_count'] = int(np.ceil(2 * rank_error * quantiles.count))
+
+    if (is_text and num_unique / length <= CATEGORY_THRESHOLD) or dtype == 'category':
+        column_profile['categories'] = sorted(map(str, heavy_hitters.counters.index))
+
+    if is_text:
+        column_profile['datetime_count'] = datetime_count
+        date_percentage = round(datetime_count / length * 100, 4)
+        if date_percentage > DATETIME_THRESHOLD:
+            column_profile['datetime'] = get_datetime_stats(pd.Series(sketch['date_bounds']))
+
+    return column_profile
+
+
+def hash_chunk(chunk):
+    # Floats are Hashed by their Bits, so -0.0 is Made 0.0 and every NaN the same NaN, as duplicated() Compares them
+    floats = chunk.select_dtypes(include='floating').columns
+    if len(floats):
+        chunk = chunk.assign(**{col: (chunk[col] + 0.0).fillna(np.nan) for col in floats})
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+
+def hash_rows(df, chunksize=DUPLICATE_CHUNK_SIZE):
+    # Hash each Row to 64 Bits, a Chunk at a Time to Bound Intermediate Memory
+    row_hashes = np.empty(len(df), dtype=np.uint64)
+    for start in range(0, len(df), chunksize):
+        row_hashes[start:start + chunksize] = hash_chunk(df.iloc[start:start + chunksize])
+    return row_hashes
+
+
+def find_duplicate_rows(df, confirm=False, max_groups=MAX_DUPLICATE_GROUPS):
+    return group_duplicate_rows(hash_rows(df), lambda positions: df.iloc[positions], confirm, max_groups)
+
+
+def group_duplicate_rows(row_hashes, read_rows, confirm=False, max_groups=MAX_DUPLICATE_GROUPS):
+    # Group Rows by Hash, Reading (with read_rows(positions)) only Rows sharing a Hash to Confirm them
+    num_rows = len(row_hashes)
+
+    # Sort Hashes so Equal Rows are Adjacent (Stable, so the First Occurrence comes First)
+    order = np.argsort(row_hashes, kind='stable')
+    repeats = row_hashes[order[1:]] == row_hashes[order[:-1]]
+    in_group = np.zeros(num_rows, dtype=bool)
+    in_group[order[1:][repeats]] = True
+    in_group[order[:-1][repeats]] = True
+    candidates = np.flatnonzero(in_group)
+
+    # Later Occurrences are Duplicates, as with df.duplicated()
+    duplicate_mask = np.zeros(num_rows, dtype=bool)
+    duplicate_mask[order[1:][repeats]] = True
+
+    # Compare only Rows sharing a Hash exactly, Ruling out Hash Collisions
+    if confirm and len(candidates):
+        candidate_rows = read_rows(candidates)
+        duplicate_mask[candidates] = candidate_rows.duplicated().to_numpy()
+        candidates = candidates[candidate_rows.duplicated(keep=False).to_numpy()]
+
+    # Group Duplicate Rows by Hash, Largest Groups First
+    groups = pd.Series(candidates).groupby(row_hashes[candidates], sort=False).agg(list)
+    groups = sorted(groups, key=len, reverse=True)
+
+    return {
+        'duplicate_mask': duplicate_mask,
+        'num_duplicate_rows': int(duplicate_mask.sum()),
+        'num_duplicate_groups': len(groups),
+        'duplicate_groups': groups[:max_groups],
+    }
+
+
+def build_any_column_profile(series, approximate, missing_values=MISSING_VALUES, inferred=None):
+    if approximate:
+        return build_sketch_column_profile(series, missing_values, inferred=inferred)
+    return build_column_profile(series, missing_values, inferred)
+
+
+def build_profile(df, progress=None, approximate=None, missing_values=MISSING_VALUES):
+    num_rows, num_cols = df.shape[:2]
+    if approximate is None:
+        approximate = num_rows > SKETCH_ROWS
+    columns = {}
+
+    # One Pass over each Column
+    for i, col in enumerate(df.columns):
+        if progress is not None:
+            progress(i / max(num_cols, 1), f'Profiling {col}')
+        columns[col] = build_any_column_profile(df[col], approximate, missing_values)
+
+    # Duplicate Rows share a Row Hash
+    if progress is not None:
+        progress(1, 'Finding duplicate rows')
+    duplicates = find_duplicate_rows(df)
+
+    return assemble_profile(num_rows, columns, duplicates, approximate)
+
+
+def assemble_profile(num_rows, columns, duplicates, approximate, incomplete_rows=None):
+    # Combine Column Profiles (Accumulating their Row-Wise Null Counts, unless Rows Missing over each Fraction are
+    # Given) and Duplicate Rows into the Dataset Profile
+    num_cols = len(columns)
+    if incomplete_rows is None:
+        row_null_counts = np.zeros(num_rows, dtype=np.int32)
+        for column_profile in columns.values():
+            row_null_counts += column_profile.pop('null_mask')
+        incomplete_rows = {fraction: int((row_null_counts > num_cols * fraction).sum())
+                           for fraction in ROW_MISSING_FRACTIONS}
+
+    return {
+        'num_rows': num_rows,
+        'num_cols': num_cols,
+        'approximate': approximate,
+        'column_names': list(columns),
+        'num_duplicate_rows': duplicates['num_duplicate_rows'],
+        'num_duplicate_groups': duplicates['num_duplicate_groups'],
+        'duplicate_groups': duplicates['duplicate_groups'],
+        'rows_over_missing_fraction': incomplete_rows,
+        'columns': columns,
+    }
+
+
+def follow_edit_plan(columns, plan):
+    # Column Profiles Carried through an Edit's Operations (None where a Conversion Changed the Values),
+    # with the Number of Rows its Filters Dropped
+    columns = dict(columns)
+    dropped_rows = 0
+    for op in plan:
+        if op.get('dropped_rows'):
+            dropped_rows += op['dropped_rows']
+        elif op['op'] == 'drop_columns':
+            for col in op['columns']:
+                columns.pop(col, None)
+        elif op['op'] == 'convert':
+            columns[op['column']] = None
+        elif op['op'] == 'rename':
+            columns = {op['columns'].get(name, name): column_profile for name, column_profile in columns.items()}
+    return columns, dropped_rows
+
+
+def drop_null_rows(column_profile, dropped_rows, null_count, dtype):
+    # Rows Dropped where a Column was Null leave its Values (and so its Statistics) as they were, so only its Length
+    # and Null Count Change. None if it Lost Values, or if the Shorter Length Tips a Threshold (so Rescan it)
+    if column_profile['null_count'] - null_count != dropped_rows:
+        return None
+    length = column_profile['length'] - dropped_rows
+    # Without Nulls an Integer Column Loads as Integers rather than Floats, any other Change of Type is Rescanned
+    is_numeric = pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+    is_text = is_text_dtype(pd.api.types.pandas_dtype(dtype))
+    was_text = is_text_dtype(pd.api.types.pandas_dtype(column_profile['dtype']))
+    if is_numeric != column_profile['is_numeric'] or is_text != was_text:
+        return None
+    column_profile = {**column_profile, 'dtype': dtype, 'is_numeric': is_numeric, 'length': length,
+                      'null_count': null_count}
+    if column_profile['num_unique'] <= 2 or not length:
+        return column_profile
+
+    approximate = column_profile['approximate']
+    numeric_percentage = column_profile['numeric_count'] / length * 100
+    if 'numeric_count' in approximate:
+        # Estimated from a Sample, which would now Come Closer to the Threshold
+        if numeric_percentage >= NUMERIC_THRESHOLD - SAMPLE_MARGIN:
+            return None
+    elif ('numeric' in column_profile) != (is_numeric or numeric_percentage >= NUMERIC_THRESHOLD):
+        return None
+
+    is_categorical = (is_text and column_profile['num_unique'] / length <= CATEGORY_THRESHOLD) or dtype == 'category'
+    if ('categories' in column_profile) != is_categorical:
+        return None
+
+    if 'datetime_count' in column_profile:
+        date_percentage = column_profile['datetime_count'] / length * 100
+        if 'datetime_count' in approximate:
+            if date_percentage >= DATETIME_THRESHOLD - SAMPLE_MARGIN:
+                return None
+        elif ('datetime' in column_profile) != (date_percentage > DATETIME_THRESHOLD):
+            return None
+    return column_profile
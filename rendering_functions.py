@@ -0,0 +1,44 @@
+import io
+import threading
+from contextlib import contextmanager
+from matplotlib.figure import Figure
+from metrics_functions import timed
+
+# Idle Figures Kept per Size, for Reuse by the Next Render of that Size
+FIGURE_POOL_SIZE = 4
+# Resolution of PNG Output (Matplotlib Renders at 100 Dots per Inch by Default)
+PNG_DPI = 72
+
+# Idle Figures by Size, Shared by this Worker's Threads
+_figure_pool = {}
+_pool_lock = threading.Lock()
+
+
+@contextmanager
+def borrow_figure(figsize):
+    # A Figure only this Thread Draws on (Figures are Independent of pyplot's Global State), Cleared and Returned
+    # to the Pool Afterwards, even if Drawing Failed
+    with _pool_lock:
+        idle = _figure_pool.get(figsize)
+        fig = idle.pop() if idle else None
+    if fig is None:
+        fig = Figure(figsize=figsize)
+    try:
+        yield fig
+    finally:
+        fig.clear()
+        with _pool_lock:
+            idle = _figure_pool.setdefault(figsize, [])
+            if len(idle) < FIGURE_POOL_SIZE:
+                idle.append(fig)
+
+
+@timed('rasterise')
+def render_figure(fig, fmt='png', dpi=PNG_DPI):
+    # SVG is Written as Vectors (so dpi does not Apply), without a Timestamp so the Same Plot gives the Same File
+    img = io.BytesIO()
+    if fmt == 'svg':
+        fig.savefig(img, format='svg', metadata={'Date': None})
+    else:
+        fig.savefig(img, format='png', dpi=dpi)
+    return img.getvalue()
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+
+class HyperLogLog:
+    # Distinct Count Sketch, Relative Standard Error of 1.04 / sqrt(2 ** precision)
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_array(np.asarray(values.to_numpy()))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+
+        # Rank is the Position of the First Set Bit in the Remaining Bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (64 - self.precision) - bit_length + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+
+        # Linear Counting for Small Cardinalities
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class KLLSketch:
+    # Quantile Sketch, Rank Error of roughly 1.7 / k
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.compress()
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                # Keep every other Sorted Item (from a Random Offset) at Double the Weight
+                items = np.sort(items)
+                leftover = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(leftover)]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, fractions):
+        items, cumulative = self.weighted_items()
+        if len(items) == 0:
+            return [np.nan for _ in fractions]
+        total = cumulative[-1]
+        return [items[min(np.searchsorted(cumulative, fraction * total), len(items) - 1)] for fraction in fractions]
+
+    def rank(self, value, side='left'):
+        # Approximate Number of Values below value (or at most value, if side is 'right')
+        items, cumulative = self.weighted_items()
+        position = np.searchsorted(items, value, side=side)
+        if position == 0:
+            return 0
+        return int(round(cumulative[position - 1] / cumulative[-1] * self.count))
+
+    def rank_error(self):
+        return 1.7 / self.k
+
+
+class MisraGries:
+    # Heavy Hitter Sketch, each Count is Underestimated by at most n / (capacity + 1)
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = pd.Series(dtype='int64')
+        self.count = 0
+        self.exact = True
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts()
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(object)
+        self.count += int(counts.sum())
+        self.add_counts(counts)
+
+    def merge(self, other):
+        self.count += other.count
+        self.exact = self.exact and other.exact
+        self.add_counts(other.counters)
+
+    def add_counts(self, counts):
+        counters = self.counters.add(counts, fill_value=0).astype('int64')
+
+        # Too many Counters, Subtract the (capacity + 1)-th Largest Count from all
+        if len(counters) > self.capacity:
+            threshold = counters.nlargest(self.capacity + 1).iloc[-1]
+            counters = counters[counters > threshold] - threshold
+            self.exact = False
+        self.counters = counters
+
+    def top(self, k):
+        return self.counters.sort_values(ascending=False, kind='stable').head(k)
+
+    def error(self):
+        return 0 if self.exact else self.count // (self.capacity + 1)
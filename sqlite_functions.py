@@ -0,0 +1,112 @@
+import os
+import sqlite3
+from urllib.parse import quote
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+# Affinities of Columns that may Store Numbers (Text Affinity Converts them to Text)
+NUMERIC_AFFINITIES = ('INTEGER', 'REAL', 'NUMERIC', 'BLOB')
+# Columns Summarised per Aggregate Query (SQLite Allows at most 2000 Result Columns)
+SUMMARY_COLUMNS_PER_QUERY = 250
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def connect_readonly(db_path):
+    # Uploads are only Read, never Modified (or Created, if Missing)
+    return sqlite3.connect(f'file:{quote(os.path.abspath(db_path))}?mode=ro', uri=True)
+
+
+def list_tables(db_path, count_rows=True):
+    # Tables and Views of the Database (Internal Tables Excluded), in the Order they were Created
+    conn = connect_readonly(db_path)
+    try:
+        rows = conn.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view') "
+                            "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY rowid").fetchall()
+        tables = []
+        for name, table_type in rows:
+            table = {'name': name, 'type': table_type, 'num_columns': len(get_table_columns(conn, name))}
+            if count_rows:
+                table['num_rows'] = conn.execute(f'SELECT COUNT(*) FROM {quote_identifier(name)}').fetchone()[0]
+            tables.append(table)
+        return tables
+    finally:
+        conn.close()
+
+
+def get_table_columns(conn, table):
+    # Column Names and Declared Types, as PRAGMA table_info Lists them
+    return [(row[1], row[2] or '') for row in conn.execute(f'PRAGMA table_info({quote_identifier(table)})')]
+
+
+def get_affinity(declared_type):
+    # Type Affinity SQLite Gives a Declared Type (https://www.sqlite.org/datatype3.html#determination_of_column_affinity)
+    declared_type = declared_type.upper()
+    if 'INT' in declared_type:
+        return 'INTEGER'
+    if any(name in declared_type for name in ('CHAR', 'CLOB', 'TEXT')):
+        return 'TEXT'
+    if 'BLOB' in declared_type or not declared_type:
+        return 'BLOB'
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'REAL'
+    return 'NUMERIC'
+
+
+def get_table_summary(db_path, table, distinct=None, affinities=None):
+    # Row Count, and each Column's Null Count, Range, Storage Classes and Distinct Count, Aggregated by SQLite itself
+    # (distinct Lists the Columns to Count Distinct Values of, and affinities the Column Affinities to Aggregate, None for all)
+    conn = connect_readonly(db_path)
+    try:
+        columns = [(name, declared_type, get_affinity(declared_type)) for name, declared_type in get_table_columns(conn, table)]
+        num_rows = conn.execute(f'SELECT COUNT(*) FROM {quote_identifier(table)}').fetchone()[0]
+        summary = {'table': table, 'num_rows': num_rows, 'columns': {}}
+        for name, declared_type, affinity in columns:
+            summary['columns'][name] = {'declared_type': declared_type, 'affinity': affinity, 'count': None,
+                                        'null_count': None, 'integer_count': None, 'real_count': None,
+                                        'min': None, 'max': None, 'num_unique': None}
+
+        columns = [column for column in columns if affinities is None or column[2] in affinities]
+        for start in range(0, len(columns), SUMMARY_COLUMNS_PER_QUERY):
+            group = columns[start:start + SUMMARY_COLUMNS_PER_QUERY]
+            expressions = []
+            for name, _, _ in group:
+                column = quote_identifier(name)
+                expressions += [f'COUNT({column})', f'MIN({column})', f'MAX({column})',
+                                f"TOTAL(typeof({column}) = 'integer')", f"TOTAL(typeof({column}) = 'real')"]
+                if distinct is None or name in distinct:
+                    expressions.append(f'COUNT(DISTINCT {column})')
+            values = iter(conn.execute(f'SELECT {", ".join(expressions)} FROM {quote_identifier(table)}').fetchone())
+
+            for name, _, _ in group:
+                count, minimum, maximum, integer_count, real_count = (next(values) for _ in range(5))
+                summary['columns'][name].update({
+                    'count': count,
+                    'null_count': num_rows - count,
+                    'integer_count': int(integer_count),
+                    'real_count': int(real_count),
+                    'min': minimum,
+                    'max': maximum,
+                    'num_unique': next(values) if distinct is None or name in distinct else None,
+                })
+        return summary
+    finally:
+        conn.close()
+
+
+def iter_table_rows(db_path, table, columns, chunksize):
+    # Rows of the Table, Fetched a Chunk at a Time
+    conn = connect_readonly(db_path)
+    try:
+        cursor = conn.execute(f'SELECT {", ".join(map(quote_identifier, columns))} FROM {quote_identifier(table)}')
+        while rows := cursor.fetchmany(chunksize):
+            yield rows
+    finally:
+        conn.close()
+
+
+# Background Job: Summarise a Table in SQL, without Reading it into Pandas
+def summarise_table(db_path, table, progress):
+    progress(0, f'Summarising {table}')
+    return get_table_summary(db_path, table)
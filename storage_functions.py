@@ -0,0 +1,200 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+from metrics_functions import count_cache
+
+# Schema Metadata Key listing Text Columns to Load as Categoricals
+CATEGORIES_KEY = b'dataglimpse.categories'
+
+# Bytes of DataFrames this Worker Keeps Loaded (Least Recently Used are Evicted Past this)
+LOADED_DATASET_BYTES = 2 * 1024 ** 3
+# Bytes Read at a Time when Hashing an Upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Datasets Loaded by this Worker, keyed by Store Path -> (File Signature, DataFrame, Bytes), Oldest Used First
+_loaded_datasets = {}
+
+
+def get_tmp_path(path, suffix='.tmp'):
+    # A Name Unique to this Write, Beside the File it will Replace (Threads of a Worker Share its Process Id)
+    return f'{path}.{uuid.uuid4().hex}{suffix}'
+
+
+def clear_upload_folder(upload_folder):
+    # Run Once per Deployment, before any Worker Starts (Workers Share the Stores and Jobs in the Folder)
+    for filename in os.listdir(upload_folder):
+        # Keep Dotfiles (e.g. .gitkeep), which Belong to the Checkout rather than the App
+        if filename.startswith('.'):
+            continue
+        file_path = os.path.join(upload_folder, filename)
+        try:
+            if os.path.isdir(file_path) and not os.path.islink(file_path):
+                shutil.rmtree(file_path)
+            else:
+                os.remove(file_path)
+        except Exception as e:
+            print(f'Failed to delete {file_path}. Reason: {e}')
+
+
+def get_store_path(upload_folder, filename):
+    return os.path.join(upload_folder, f'{filename}.feather')
+
+
+def save_upload(file, upload_folder, ext):
+    # Uploads are Named by their Content Hash, so Identical Uploads are Stored (and Ingested) Once
+    digest = hashlib.sha256()
+    tmp_path = get_tmp_path(os.path.join(upload_folder, 'upload'))
+    with open(tmp_path, 'wb') as f:
+        while chunk := file.stream.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            f.write(chunk)
+
+    upload_name = f'{digest.hexdigest()[:32]}{ext}'
+    upload_path = os.path.join(upload_folder, upload_name)
+    if os.path.exists(upload_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, upload_path)
+    return upload_name
+
+
+def link_dataset(source_path, store_path):
+    # Stores are only ever Replaced, never Written in Place, so a Hard Link is a Safe Copy
+    # (and Shares the File Signature, so the Column Index still Applies)
+    for source, target in ((get_index_path(source_path), get_index_path(store_path)), (source_path, store_path)):
+        if not os.path.exists(source):
+            continue
+        tmp_path = get_tmp_path(target)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+
+def dataframe_to_table(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-Type Object Columns cannot be Stored as Arrow, so Store them as Strings
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def save_dataset(df, store_path):
+    save_table(dataframe_to_table(df.reset_index(drop=True)), store_path)
+
+
+def save_table(table, store_path):
+    # Write Uncompressed (so it can be Memory-Mapped), then Swap in so Readers never see a Partial File
+    tmp_path = get_tmp_path(store_path)
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, store_path)
+    _loaded_datasets.pop(store_path, None)
+
+
+def get_preview_path(store_path):
+    return store_path.replace('.feather', '.preview.feather')
+
+
+def get_settings_path(store_path):
+    return f'{store_path}.settings.json'
+
+
+def get_versions_path(store_path):
+    return f'{store_path}.versions'
+
+
+def get_sort_folder(store_path):
+    return f'{store_path}.sort'
+
+
+def get_types_folder(store_path):
+    return f'{store_path}.types'
+
+
+def get_index_path(store_path):
+    return f'{store_path}.columns.json'
+
+
+def load_dataset_settings(store_path):
+    settings_path = get_settings_path(store_path)
+    if not os.path.exists(settings_path):
+        return {}
+    with open(settings_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_dataset_settings(store_path, settings):
+    tmp_path = get_tmp_path(get_settings_path(store_path))
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f)
+    os.replace(tmp_path, get_settings_path(store_path))
+
+
+def get_categorical_columns(schema):
+    metadata = schema.metadata or {}
+    return json.loads(metadata.get(CATEGORIES_KEY, b'[]'))
+
+
+def get_file_signature(store_path):
+    stat = os.stat(store_path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def load_dataset(store_path):
+    # Reuse this Worker's DataFrame if the Stored File has not been Replaced (e.g. by an Edit in another Worker)
+    signature = get_file_signature(store_path)
+    loaded = _loaded_datasets.pop(store_path, None)
+    count_cache('dataset', loaded is not None and loaded[0] == signature)
+    if loaded is not None and loaded[0] == signature:
+        _loaded_datasets[store_path] = loaded
+        return loaded[1]
+
+    # Memory-Map the File so all Workers share one Copy in the Page Cache
+    df = table_to_dataframe(feather.read_table(store_path, memory_map=True))
+
+    _loaded_datasets[store_path] = (signature, df, int(df.memory_usage(deep=True).sum()))
+    evict_loaded_datasets()
+    return df
+
+
+def load_column(store_path, column):
+    # One Column of the Memory-Mapped Store, as load_dataset would Give it
+    table = feather.read_table(store_path, columns=[column], memory_map=True)
+    return table_to_dataframe(table)[column]
+
+
+def table_to_dataframe(table):
+    df = table.to_pandas(split_blocks=True, categories=get_categorical_columns(table.schema))
+
+    # Arrow Nulls come back as None in Text Columns, Restore NaN as read_csv gives
+    for col in df.columns[df.dtypes == object]:
+        if table.column(col).null_count:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def evict_loaded_datasets(max_bytes=LOADED_DATASET_BYTES):
+    # Drop Least Recently Used DataFrames (Keeping the Latest) until Under Budget
+    total_bytes = sum(loaded[2] for loaded in _loaded_datasets.values())
+    while total_bytes > max_bytes and len(_loaded_datasets) > 1:
+        oldest = next(iter(_loaded_datasets))
+        total_bytes -= _loaded_datasets.pop(oldest)[2]
+
+
+def delete_dataset(store_path):
+    _loaded_datasets.pop(store_path, None)
+    for path in (store_path, get_preview_path(store_path), get_settings_path(store_path), get_index_path(store_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(get_versions_path(store_path), ignore_errors=True)
+    shutil.rmtree(get_sort_folder(store_path), ignore_errors=True)
+    shutil.rmtree(get_types_folder(store_path), ignore_errors=True)
@@ -0,0 +1,52 @@
+import pyarrow as pa
+
+# Content-Encodings Responses can be Compressed with (Preferred First) -> Arrow Codec
+CONTENT_ENCODINGS = {'br': 'brotli', 'zstd': 'zstd', 'gzip': 'gzip'}
+
+
+class ChunkSink:
+    # File-Like Object Collecting Compressed Bytes until they are Yielded
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def choose_encoding(accept_encodings, allowed=CONTENT_ENCODINGS):
+    # First Allowed Encoding the Client Accepts (request.accept_encodings), else None
+    for encoding in allowed:
+        if encoding in accept_encodings and pa.Codec.is_available(CONTENT_ENCODINGS[encoding]):
+            return encoding
+    return None
+
+
+def compress_chunks(chunks, encoding):
+    # Compress a Stream of Byte Chunks as they are Generated
+    if encoding is None:
+        yield from chunks
+        return
+
+    sink = ChunkSink()
+    stream = pa.CompressedOutputStream(pa.PythonFile(sink, mode='w'), CONTENT_ENCODINGS[encoding])
+    for chunk in chunks:
+        stream.write(chunk)
+        data = sink.drain()
+        if data:
+            yield data
+    stream.close()
+    yield sink.drain()
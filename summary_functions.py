@@ -1,51 +1,47 @@
 import pandas as pd
-import io
-import base64
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import sqlite3
-import os
-
-
-def read_data(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-
-    # Read CSV Files
-    if ext == '.csv':
-        return pd.read_csv(file_path)
-
-    # Read SQLite Files
-    elif ext in ['.sqlite', '.sqlite3', '.db']:
-        conn = sqlite3.connect(file_path)
-        table = conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchone()[0]
-        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-        conn.close()
-        return df
-    
-    # Return Error if Unsupported File Type
-    else:
-        raise ValueError(f"Unsupported File Type: {ext}")
-    
-def get_dataframe_summary(df: pd.DataFrame) -> dict:
+import numpy as np
+from functools import reduce
+from paging_functions import get_store_columns, count_rows
+from job_functions import run_tasks, TASK_WORKERS
+from engine_functions import get_engine, count_incomplete_rows, split_store_batches, sketch_store_batches, \
+    finish_store_sketch
+from profile_functions import build_profile, build_column_profile, assemble_profile, get_numeric_series, \
+    follow_edit_plan, drop_null_rows, merge_column_sketches, SKETCH_ROWS
+from metadata_functions import get_column_index
+from inference_functions import get_logical_dtype
+from plot_cache_functions import get_plot_key, load_plot, save_plot, PLOT_FOLDER
+from metrics_functions import timed, count_cache
+from plotting_functions import get_distribution
+from rendering_functions import borrow_figure, render_figure
+
+# Summary Distribution Images: Size (Inches) and Format ('svg', or 'png' at rendering_functions.PNG_DPI)
+SUMMARY_FIGSIZE = (10, 4)
+SUMMARY_PLOT_FORMAT = 'png'
+
+
+def get_dataframe_summary(df: pd.DataFrame, profile: dict = None) -> dict:
+    if profile is None:
+        profile = build_profile(df)
+
     # Number of Rows and Columns
-    num_rows, num_cols = df.shape[:2]
+    num_rows, num_cols = profile['num_rows'], profile['num_cols']
     # List of Col Names
-    col_names = ", ".join(df.columns.tolist())
+    col_names = ", ".join(map(str, profile['column_names']))
     # Number of Duplicate Rows
-    num_duplicate_rows = df.duplicated().sum()
+    num_duplicate_rows = profile['num_duplicate_rows']
 
     # Number of Rows exceeding Missing Value Thresholds
+    rows_over = profile['rows_over_missing_fraction']
     missing_thresholds = {
-        ">10% Values Missing": (df.isnull().sum(axis=1) > num_cols / 10).sum(),
-        ">25% Values Missing": (df.isnull().sum(axis=1) > num_cols / 4).sum(),
-        ">50% Values Missing": (df.isnull().sum(axis=1) > num_cols / 2).sum(),
+        ">10% Values Missing": rows_over[0.1],
+        ">25% Values Missing": rows_over[0.25],
+        ">50% Values Missing": rows_over[0.5],
     }
     missing_filtered = {k: int(v) for k, v in missing_thresholds.items() if v > 0}
 
     # Top 5 Columns with Missing Values
-    col_missing_counts = df.isnull().sum()
-    top5_missing_cols = col_missing_counts.sort_values(ascending=False).head(5)
+    col_missing_counts = pd.Series({col: column_profile['null_count'] for col, column_profile in profile['columns'].items()}, dtype='int64')
+    top5_missing_cols = col_missing_counts.sort_values(ascending=False, kind='stable').head(5)
     top5_missing_dict = {col: int(count) for col, count in top5_missing_cols.items() if count > 0}
     
     df_summary = {
@@ -55,6 +51,15 @@ def get_dataframe_summary(df: pd.DataFrame) -> dict:
         "Number of Duplicate Rows": int(num_duplicate_rows),
     }
 
+    # Largest Groups of Identical Rows (by Row Index)
+    if num_duplicate_rows:
+        df_summary["Duplicate Row Groups"] = {
+            'Rows ' + ', '.join(map(str, group[:10])) + (', ...' if len(group) > 10 else ''): f'{len(group)} copies'
+            for group in profile['duplicate_groups']
+        }
+        if profile['num_duplicate_groups'] > len(profile['duplicate_groups']):
+            df_summary["Duplicate Row Groups"]['Other Groups'] = profile['num_duplicate_groups'] - len(profile['duplicate_groups'])
+
     if missing_filtered:
         df_summary["Number of Rows with Missing Values(%)"] = missing_filtered
         if missing_filtered.get(">25% Values Missing") or missing_filtered.get(">50% Values Missing"):
@@ -66,156 +71,154 @@ def get_dataframe_summary(df: pd.DataFrame) -> dict:
     return df_summary
 
 
-def get_general_summary(series):
+def format_error(error):
+    # Relative Errors are Fractions, Count Errors are Rows, and Quantile Errors are the Range of Values they Span
+    if isinstance(error, (list, tuple)):
+        return f'(between {float(error[0])} and {float(error[1])})'
+    if isinstance(error, (int, np.integer)):
+        return f'± {error:,}'
+    return f'± {error:.1%}'
+
+
+def mark_approximate(value, column_profile, key):
+    # Values Estimated with Sketches are Marked, with their Error Bound (Values Estimated from a Sample have None)
+    if key not in column_profile['approximate']:
+        return value
+    error = column_profile.get('errors', {}).get(key)
+    return f'≈ {value}' if error is None else f'≈ {value} {format_error(error)}'
+
+
+def get_general_summary(column_profile):
+    length = column_profile['length']
     # Get Data Type Distribution
-    col_summary = {'Data Type': str(series.dtype)}
+    col_summary = {'Data Type': get_logical_dtype(column_profile['dtype'])}
     # Get Number of Unique Values
-    num_unique = series.nunique(dropna=True)
-    col_summary['Unique Values'] = f'{num_unique} (Out of {len(series)})'
+    num_unique = column_profile['num_unique']
+    col_summary['Unique Values'] = f"{mark_approximate(num_unique, column_profile, 'num_unique')} (Out of {length})"
     # Get Number of "Missing Values"
-    uppercase_series = series.astype(str).str.strip().str.upper()
-    MISSING_VALUES = ['NONE', 'NIL', 'NA', 'NULL', 'N/A', '', ' ']
-    print(uppercase_series)
-    missing = {}
-    for value in MISSING_VALUES:
-        count = (uppercase_series == value).sum()
-        if count > 0:
-            missing[value] = count
-    if series.isna().sum() > 0:
-        missing['NaN'] = series.isna().sum()
+    missing = dict(column_profile['missing'])
+    if column_profile['null_count'] > 0:
+        missing['NaN'] = column_profile['null_count']
     missing_count = sum(missing.values())
-    missing_percentage = round(missing_count / len(series) * 100, 4)
+    missing_percentage = round(missing_count / length * 100, 4)
     col_summary['Missing Values'] = missing or 0
     if missing_percentage > 0:
-        col_summary['Missing Values (%)'] = f'{missing_percentage}% ({missing_count} of {len(series)})'
+        col_summary['Missing Values (%)'] = f'{missing_percentage}% ({missing_count} of {length})'
     if missing_percentage > 50:
         col_summary['Recommendation'] = f'High Percentage ({missing_percentage}%) of missing values - Consider if Column is Necessary)'
 
     return col_summary
 
 
-def update_binary_summary(series, col_summary):
+def update_binary_summary(column_profile, col_summary):
     col_summary['Recommendation'] = "Convert to Binary Column"
     # Get Count of Each Variable 
     col_summary['Value Counts (Binary)'] = {
-        str(k): f"{v} ({(v / len(series) * 100):.2f}%)" for k, v in series.value_counts().items()
+        str(k): f"{v} ({(v / column_profile['length'] * 100):.2f}%)" for k, v in column_profile['top_values'].items()
     }
 
 
-def update_numeric_summary(numeric_series, col_summary):
-    zero_count = numeric_series.eq(0).sum()
+def update_numeric_summary(column_profile, col_summary):
+    numeric_stats = column_profile['numeric']
+    length = column_profile['length']
+    zero_count = numeric_stats['zero_count']
     if zero_count:
         col_summary['Zero'] = int(zero_count)
-    q1 = numeric_series.quantile(0.25)
-    q3 = numeric_series.quantile(0.75)
-    mean = round(numeric_series.mean(), 4)
-    median = numeric_series.median()
-    sd = round(numeric_series.std(), 4)
-    minimum, maximum = numeric_series.min(), numeric_series.max()
-    iqr = q3 - q1
-    outliers_count = numeric_series[(numeric_series < q1 - 1.5 * iqr) | (numeric_series > q3 + 1.5 * iqr)].count()
+    q1 = numeric_stats['q1']
+    q3 = numeric_stats['q3']
+    mean = round(numeric_stats['mean'], 4)
+    median = numeric_stats['median']
+    sd = round(numeric_stats['std'], 4)
+    minimum, maximum = numeric_stats['min'], numeric_stats['max']
+    outliers_count = numeric_stats['outliers_count']
     
     if not pd.isna(mean):
         col_summary['Mean'] = float(mean)
     if not pd.isna(median):
-        col_summary['Median']= float(median)
+        col_summary['Median']= mark_approximate(float(median), column_profile, 'median')
     if pd.notna(minimum) and pd.notna(maximum):
         col_summary['Range'] = f'{float(minimum)} - {float(maximum)}'
     if not pd.isna(sd):
         col_summary['Standard Deviation']= float(sd)
     if not pd.isna(q1):
-        col_summary['Lower Quartile'] = float(q1)
+        col_summary['Lower Quartile'] = mark_approximate(float(q1), column_profile, 'q1')
     if not pd.isna(q3):
-        col_summary['Upper Quartile'] = float(q3)
+        col_summary['Upper Quartile'] = mark_approximate(float(q3), column_profile, 'q3')
     if outliers_count:
-        col_summary['Outlier Count (1.5x IQR)'] = f'{outliers_count} ({round(outliers_count / len(numeric_series) * 100, 2)})%'
-
+        outliers = mark_approximate(outliers_count, column_profile, 'outliers_count')
+        col_summary['Outlier Count (1.5x IQR)'] = f'{outliers} ({round(outliers_count / length * 100, 2)})%'
 
-def update_categorical_summary(series, col_summary):
-    categories = series.dropna().unique()
 
-    # Sort Categories
-    categories = sorted(map(str, categories))
-    categories = ', '.join(categories)
+def update_categorical_summary(column_profile, col_summary):
+    # Sorted Categories
+    categories = ', '.join(column_profile['categories'])
 
     # Show Categories (Max String Length of 300)
     if len(categories) > 300:
         categories = categories[:300] + '...'
-    col_summary['Categories'] = categories
+    col_summary['Categories'] = mark_approximate(categories, column_profile, 'categories')
 
     # Get Top Categories
-    top_categories = series.value_counts().head(10)
+    top_categories = column_profile['top_values']
     col_summary['Top Categories'] = {
-        str(k): f"{v} ({(v / len(series) * 100):.2f}%)" for k, v in top_categories.items()
+        str(k): mark_approximate(f"{v} ({(v / column_profile['length'] * 100):.2f}%)", column_profile, 'top_values')
+        for k, v in top_categories.items()
     }
 
 
-def update_datetime_summary(date_series, col_summary):
-    # Extract Date and Time Separately
-    dates = date_series.dt.date
-    times = date_series.dt.time
-
-    unique_dates = dates.unique()
-
+def update_datetime_summary(datetime_stats, col_summary):
     # If No Date, return Time Range
-    if len(unique_dates) == 1 and unique_dates[0] == pd.Timestamp.today().date():
-        min_time = min(times)
-        max_time = max(times)
-        col_summary['Time Range'] = f"{min_time} to {max_time}"
+    if datetime_stats['num_dates'] == 1 and datetime_stats['min_date'] == pd.Timestamp.today().date():
+        col_summary['Time Range'] = f"{datetime_stats['min_time']} to {datetime_stats['max_time']}"
     # Else, return Day Range
     else:
-        min_date = min(dates)
-        max_date = max(dates)
-        col_summary['Date Range'] = f"{min_date} to {max_date}"
-
-
-def plot_distribution(series, col_summary, num_unique):
-    # Histogram
-    plt.figure(figsize=(8,4))
-    hist_ax = series.plot(kind='hist', bins=min(15, num_unique), edgecolor='black')
-    hist_ax.xaxis.get_major_formatter().set_scientific(False)
-    hist_ax.xaxis.get_major_formatter().set_useOffset(False)
-    plt.xlabel('Value')
-    plt.ylabel('Frequency')
-    for patch in hist_ax.patches:
-        height = patch.get_height()
-        x = patch.get_x() + patch.get_width() / 2
-        hist_ax.text(x, height, f'{int(height)}', ha='center', va='bottom', fontsize=7)
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    img_base64_hist = base64.b64encode(buf.read()).decode('utf-8')
-    col_summary['Distribution (Histogram)'] = f'<img src="data:image/png;base64,{img_base64_hist}">'
-
-    # Boxplot
-    plt.figure(figsize=(4,6))
-    box_ax = series.plot(kind='box', vert=True, patch_artist=True, notch=True)
-    box_ax.yaxis.get_major_formatter().set_scientific(False)
-    box_ax.yaxis.get_major_formatter().set_useOffset(False)
-    plt.ylabel('Value')
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    img_base64_box = base64.b64encode(buf.read()).decode('utf-8')
-    col_summary['Distribution (Boxplot)'] = f'<img src="data:image/png;base64,{img_base64_box}">'
-
-def get_column_summary(df, col):
-    series = df[col]
-
-    # Thresholds for Conversion
-    CATEGORY_THRESHOLD = 0.1
-    NUMERIC_THRESHOLD = 95
-    DATETIME_THRESHOLD = 95
+        col_summary['Date Range'] = f"{datetime_stats['min_date']} to {datetime_stats['max_date']}"
+
+
+@timed('plot')
+def plot_distribution(distribution, col_summary, plot_folder, plot_key, fmt=SUMMARY_PLOT_FORMAT):
+    # Histogram and Boxplot Side by Side in one Image, Drawn from Bins and Box Stats (Computed by distribution(),
+    # only if the Plot is not Cached)
+    key = get_plot_key(plot_key, 'distribution')
+    col_summary['Distribution'] = f'{key}.{fmt}'
+
+    # Skip Rendering if the Plot is Cached
+    if load_plot(plot_folder, key, fmt):
+        return
+    counts, edges, box_stats = distribution()
+
+    with borrow_figure(SUMMARY_FIGSIZE) as fig:
+        hist_ax, box_ax = fig.subplots(1, 2, gridspec_kw={'width_ratios': [3, 1]})
+
+        # Histogram
+        hist_ax.hist(edges[:-1], edges, weights=counts, edgecolor='black')
+        hist_ax.ticklabel_format(axis='x', style='plain', useOffset=False)
+        hist_ax.set_xlabel('Value')
+        hist_ax.set_ylabel('Frequency')
+        for left, right, count in zip(edges[:-1], edges[1:], counts):
+            hist_ax.text((left + right) / 2, count, f'{int(count)}', ha='center', va='bottom', fontsize=7)
+
+        # Boxplot
+        box_ax.bxp(box_stats, patch_artist=True, shownotches=True)
+        box_ax.ticklabel_format(axis='y', style='plain', useOffset=False)
+        box_ax.set_ylabel('Value')
+
+        fig.tight_layout()
+        save_plot(plot_folder, key, render_figure(fig, fmt), fmt)
+
+@timed('summarise')
+def get_column_summary(df, col, column_profile=None, plot_folder=PLOT_FOLDER, plot_key=None, distribution=None):
+    # The Distribution is Computed from the Column, unless a Function Computing it is Given (then df may be None)
+    series = df[col] if df is not None else None
+    if column_profile is None:
+        column_profile = build_column_profile(series)
+    if plot_key is None:
+        plot_key = get_plot_key(col, int(pd.util.hash_pandas_object(series).sum()))
+    length = column_profile['length']
 
     # Get General Summary
-    col_summary = get_general_summary(series)
-    num_unique = series.nunique(dropna=True)
+    col_summary = get_general_summary(column_profile)
+    num_unique = column_profile['num_unique']
 
     # If Constant Column
     if num_unique == 1:
@@ -224,25 +227,27 @@ def get_column_summary(df, col):
 
     # If Binary Column, update Col Summary with Binary Summary
     if num_unique == 2:
-        update_binary_summary(series, col_summary)
+        update_binary_summary(column_profile, col_summary)
         return col_summary
 
     # If Index Column
-    if num_unique == len(series):
+    if num_unique == length:
         col_summary['Recommendation'] = "Index Column (Every row has unique value)"
 
     # If Numerical Column or should be Parsed to Numerical Column, get Numeric Summary
-    numeric_series = pd.to_numeric(series, errors='coerce')
-    numeric_percentage = round(numeric_series.notna().sum() / len(series) * 100, 4)
-    if numeric_percentage >= NUMERIC_THRESHOLD or pd.api.types.is_numeric_dtype(series):
+    numeric_percentage = round(column_profile['numeric_count'] / length * 100, 4)
+    if 'numeric' in column_profile:
         # Update Col Summary with Numeric Summary
-        update_numeric_summary(numeric_series, col_summary)
+        update_numeric_summary(column_profile, col_summary)
         
         # Get Distribution Graphs
-        plot_distribution(numeric_series, col_summary, num_unique)
+        if distribution is None:
+            values = get_numeric_series(series).dropna().to_numpy(dtype=np.float64)
+            distribution = lambda: get_distribution(values, min(15, num_unique))
+        plot_distribution(distribution, col_summary, plot_folder, plot_key)
 
         # If Numerical values are more than threshold, recommend to parse to Numerical
-        if not pd.api.types.is_numeric_dtype(series):
+        if not column_profile['is_numeric']:
             col_summary['Recommendation'] = f'Convert to Numeric Variable ({numeric_percentage}% can be converted)'
 
     # If Inconsistent Datatype (20% - 80% can be converted to Numeric), Flag it Out
@@ -255,21 +260,119 @@ def get_column_summary(df, col):
             col_summary['Recommendation'] = f'Inconsistent DataType ({numeric_percentage}% Numeric, {100 - numeric_percentage}% String)'
 
     # If Categorical Column or should be Parsed to Categorical Column, get Categorical Summary
-    if (series.dtype == 'object' and num_unique/len(series) <= CATEGORY_THRESHOLD) or series.dtype == 'category':
-        update_categorical_summary(series, col_summary)
+    if 'categories' in column_profile:
+        update_categorical_summary(column_profile, col_summary)
 
         # Recommend to parse to Categorical
-        col_summary['Recommendation'] = f'Convert to Categorical Variable'
+        col_summary['Recommendation'] = 'Convert to Categorical Variable'
 
     # Check if DateTime Variable
-    date_series = pd.to_datetime(series, errors='coerce')
-    date_percentage = round(date_series.notna().sum() / len(series) * 100, 4)
-    if series.dtype == 'object' and date_percentage > DATETIME_THRESHOLD:
+    if 'datetime' in column_profile:
+        date_percentage = round(column_profile['datetime_count'] / length * 100, 4)
+
         # Update Col Summary with DateTime Summary
-        update_datetime_summary(date_series, col_summary)
+        update_datetime_summary(column_profile['datetime'], col_summary)
 
         # Recommend to parse to DateTime
         col_summary.pop('Recommendation', None)
         col_summary['Recommendation'] = f'Convert to DateTime Variable ({date_percentage}% can be converted)'
 
-    return col_summary
\ No newline at end of file
+    return col_summary
+
+
+# Parallel Task: Profile one Column, Read from the Memory-Mapped Store by the Dataset's Engine
+def profile_store_column(store_path, col, approximate, missing_values):
+    return get_engine(store_path).profile_column(store_path, col, approximate, missing_values)
+
+
+# Parallel Tasks Profiling Columns, and a Function Collecting their Results into a Profile per Column. Exact Profiles
+# are a Task per Column. Approximate ones Split each Column's Record Batches over the Workers Columns Leave Idle, and
+# Merge the Sketches of the Parts
+def get_profile_tasks(store_path, columns, approximate, missing_values):
+    if not approximate:
+        tasks = [(profile_store_column, (store_path, col, approximate, missing_values)) for col in columns]
+        return tasks, lambda results: results
+
+    parts = split_store_batches(store_path, max(1, TASK_WORKERS // max(len(columns), 1)))
+    tasks = [(sketch_store_batches, (store_path, col, missing_values, batch_indexes))
+             for col in columns for batch_indexes in parts]
+
+    def collect(results):
+        return [finish_store_sketch(store_path, col, reduce(merge_column_sketches, results[i:i + len(parts)]))
+                for col, i in zip(columns, range(0, len(results), len(parts)))]
+    return tasks, collect
+
+
+# Parallel Task: Find Duplicate Rows of the Stored Dataset
+def find_store_duplicates(store_path):
+    duplicates = get_engine(store_path).find_duplicates(store_path)
+    duplicates.pop('duplicate_mask')
+    return duplicates
+
+
+# Parallel Task: Summarise one Column (Rendering its Plots), Read from the Memory-Mapped Store
+def summarise_store_column(store_path, col, column_profile, plot_folder, plot_key):
+    engine = get_engine(store_path)
+    return get_column_summary(None, col, column_profile, plot_folder, plot_key,
+                              distribution=lambda: engine.get_distribution(store_path, col, column_profile))
+
+
+# Background Job: Profile every Column of the Stored Dataset, Spreading Columns (and the Duplicate Search) over Processes
+@timed('profile')
+def profile_dataset(store_path, approximate, missing_values, progress):
+    columns = get_store_columns(store_path)
+    num_rows = count_rows(store_path)
+    if approximate is None:
+        approximate = num_rows > SKETCH_ROWS
+
+    column_tasks, collect = get_profile_tasks(store_path, columns, approximate, missing_values)
+    duplicates, *results = run_tasks([(find_store_duplicates, (store_path,))] + column_tasks, progress,
+                                     'Profiling columns')
+    return assemble_profile(num_rows, dict(zip(columns, collect(results))), duplicates, approximate,
+                            count_incomplete_rows(store_path))
+
+
+# Background Job: Carry the Profile from before an Edit through its Operations, Rescanning only Columns it Changed
+# (Renamed and Untouched Columns are Reused, and Rows Dropped where a Column was Null only Change its Counts)
+@timed('profile')
+def update_profile(store_path, profile, plan, approximate, missing_values, progress):
+    num_rows = count_rows(store_path)
+    if approximate is None:
+        approximate = num_rows > SKETCH_ROWS
+    if approximate != profile['approximate']:
+        return profile_dataset(store_path, approximate, missing_values, progress)
+
+    index = get_column_index(store_path)
+    carried, dropped_rows = follow_edit_plan(profile['columns'], plan)
+    columns = {}
+    for col in get_store_columns(store_path):
+        column_profile = carried.get(col)
+        if column_profile is not None and dropped_rows:
+            column_profile = drop_null_rows(column_profile, dropped_rows, index[col]['null_count'], index[col]['dtype'])
+        count_cache('column_profile', column_profile is not None)
+        columns[col] = column_profile
+
+    # Renaming Columns Changes no Row, so Duplicate Rows are as they were
+    renamed_only = all(op['op'] == 'rename' for op in plan)
+    rescanned = [col for col, column_profile in columns.items() if column_profile is None]
+    column_tasks, collect = get_profile_tasks(store_path, rescanned, approximate, missing_values)
+    tasks = [] if renamed_only else [(find_store_duplicates, (store_path,))]
+    results = run_tasks(tasks + column_tasks, progress, 'Profiling changed columns')
+
+    duplicates = profile if renamed_only else results.pop(0)
+    columns.update(zip(rescanned, collect(results)))
+    return assemble_profile(num_rows, columns, duplicates, approximate, count_incomplete_rows(store_path))
+
+
+# Background Job: Summarise one Column of the Stored Dataset from its Profile
+def profile_column(store_path, col, column_profile, plot_folder, plot_key, progress):
+    progress(0, f'Summarising {col}')
+    return summarise_store_column(store_path, col, column_profile, plot_folder, plot_key)
+
+
+# Background Job: Summarise every Column of the Stored Dataset from its Profile, Columns in Parallel
+def build_report(store_path, profile, plot_folder, plot_keys, progress):
+    columns = profile['column_names']
+    tasks = [(summarise_store_column, (store_path, col, profile['columns'][col], plot_folder, plot_keys[col]))
+             for col in columns]
+    return dict(zip(columns, run_tasks(tasks, progress, 'Summarising columns')))
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import pyarrow as pa
+import pyarrow.feather as feather
+from storage_functions import CATEGORIES_KEY, get_versions_path, get_categorical_columns, dataframe_to_table, save_table, \
+    get_tmp_path
+from metrics_functions import timed
+from metadata_functions import get_column_index, update_column_index, save_column_index, get_column_dtype
+
+# Bytes of Column Files Kept for Versions (Oldest Versions are Evicted Past this)
+VERSION_STORE_BYTES = 1024 ** 3
+# Operations that Remove Rows, so every Column Changes
+ROW_OPS = ('drop_duplicates', 'dropna')
+
+
+def get_manifest_path(store_path):
+    return os.path.join(get_versions_path(store_path), 'versions.json')
+
+
+def get_column_path(store_path, column_id):
+    return os.path.join(get_versions_path(store_path), 'columns', f'{column_id}.feather')
+
+
+def load_versions(store_path):
+    manifest_path = get_manifest_path(store_path)
+    if not os.path.exists(manifest_path):
+        return {'current': None, 'next_id': 0, 'versions': []}
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_versions(store_path, versions):
+    tmp_path = get_tmp_path(get_manifest_path(store_path))
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(versions, f)
+    os.replace(tmp_path, get_manifest_path(store_path))
+
+
+def get_version(versions, version_id):
+    return next((version for version in versions['versions'] if version['id'] == version_id), None)
+
+
+def get_current_column_ids(store_path):
+    # Column -> Column File of the Current Version (Empty before the First Edit)
+    versions = load_versions(store_path)
+    version = get_version(versions, versions['current'])
+    return dict(version['columns']) if version else {}
+
+
+def get_version_position(versions):
+    return next((i for i, version in enumerate(versions['versions']) if version['id'] == versions['current']), None)
+
+
+def write_columns(store_path, table, column_ids):
+    # Write only Columns without a File, Unchanged Columns keep Sharing their Parent's
+    categories = set(get_categorical_columns(table.schema))
+    for name, column_id in column_ids:
+        column_path = get_column_path(store_path, column_id)
+        if os.path.exists(column_path):
+            continue
+        metadata = {CATEGORIES_KEY: json.dumps(['values'] if name in categories else [])}
+        column_table = pa.table({'values': table.column(name)}).replace_schema_metadata(metadata)
+        tmp_path = get_tmp_path(column_path)
+        feather.write_feather(column_table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, column_path)
+
+
+def add_version(store_path, versions, table, column_ids, ops, index):
+    # New Version follows the Current one, Discarding any Versions that could have been Redone
+    position = get_version_position(versions)
+    parent = versions['versions'][position] if position is not None else None
+    if position is not None:
+        versions['versions'] = versions['versions'][:position + 1]
+
+    write_columns(store_path, table, column_ids)
+    version = {
+        'id': versions['next_id'],
+        'created': time.time(),
+        'num_rows': table.num_rows,
+        'columns': column_ids,
+        'ops': ops,
+        'plan': (parent['plan'] if parent else []) + ops,
+        'index': index,
+    }
+    versions['versions'].append(version)
+    versions['current'] = version['id']
+    versions['next_id'] += 1
+    return version
+
+
+def get_column_ids(parent, plan, names):
+    # Columns the Plan did not Touch keep their Parent's File (Copy-on-Write), others get a New One
+    if any(op['op'] in ROW_OPS for op in plan):
+        return [[name, uuid.uuid4().hex] for name in names]
+
+    column_ids = dict(parent['columns'])
+    for op in plan:
+        if op['op'] == 'convert':
+            column_ids.pop(op['column'], None)
+        elif op['op'] == 'drop_columns':
+            for col in op['columns']:
+                column_ids.pop(col, None)
+        elif op['op'] == 'rename':
+            column_ids = {op['columns'].get(name, name): column_id for name, column_id in column_ids.items()}
+    return [[name, column_ids.get(name) or uuid.uuid4().hex] for name in names]
+
+
+@timed('commit')
+def commit_version(store_path, data, plan, max_bytes=VERSION_STORE_BYTES):
+    # Record the Edited Dataset (a Dataframe, or an Arrow Table from an Engine) as a New Version, and Make it the
+    # Stored Dataset
+    os.makedirs(os.path.dirname(get_column_path(store_path, '')), exist_ok=True)
+    versions = load_versions(store_path)
+
+    # First Edit, so Snapshot the Dataset as Uploaded
+    if versions['current'] is None:
+        table = feather.read_table(store_path, memory_map=True)
+        add_version(store_path, versions, table, [[name, uuid.uuid4().hex] for name in table.column_names], [],
+                    get_column_index(store_path))
+
+    # Column Metadata is Carried Over from the Parent for Columns the Plan did not Touch
+    parent = get_version(versions, versions['current'])
+    table = data if isinstance(data, pa.Table) else dataframe_to_table(data.reset_index(drop=True))
+    index = update_column_index(parent.get('index') or get_column_index(store_path), table, plan)
+    version = add_version(store_path, versions, table, get_column_ids(parent, plan, table.column_names), plan, index)
+    save_table(table, store_path)
+    save_column_index(store_path, index)
+
+    evict_versions(store_path, versions, max_bytes)
+    save_versions(store_path, versions)
+    return version
+
+
+def checkout_version(store_path, versions, version_id):
+    # Assemble the Version from its Column Files into the Stored Dataset
+    version = get_version(versions, version_id)
+    arrays = []
+    categories = []
+    for name, column_id in version['columns']:
+        column_table = feather.read_table(get_column_path(store_path, column_id), memory_map=True)
+        arrays.append(column_table.column(0))
+        if get_categorical_columns(column_table.schema):
+            categories.append(name)
+
+    names = [name for name, _ in version['columns']]
+    table = pa.Table.from_arrays(arrays, names=names, metadata={CATEGORIES_KEY: json.dumps(categories)})
+    save_table(table, store_path)
+    if version.get('index'):
+        # Column Files keep no Pandas Types, so the Reassembled Store may Load with Different ones
+        save_column_index(store_path, {name: {**metadata, 'dtype': get_column_dtype(table, name)}
+                                       for name, metadata in version['index'].items()})
+
+    versions['current'] = version_id
+    save_versions(store_path, versions)
+    return version
+
+
+def undo_version(store_path):
+    versions = load_versions(store_path)
+    position = get_version_position(versions)
+    if not position:
+        return None
+    return checkout_version(store_path, versions, versions['versions'][position - 1]['id'])
+
+
+def redo_version(store_path):
+    versions = load_versions(store_path)
+    position = get_version_position(versions)
+    if position is None or position + 1 == len(versions['versions']):
+        return None
+    return checkout_version(store_path, versions, versions['versions'][position + 1]['id'])
+
+
+def get_current_plan(store_path):
+    versions = load_versions(store_path)
+    version = get_version(versions, versions['current'])
+    return version['plan'] if version else []
+
+
+def diff_versions(store_path, version_id):
+    # Compare Version N against the Current Version, Column by Column (Shared Files are Unchanged)
+    versions = load_versions(store_path)
+    current = get_version(versions, versions['current'])
+    other = get_version(versions, version_id)
+    if current is None or other is None:
+        return None
+
+    current_ids = dict(current['columns'])
+    other_ids = dict(other['columns'])
+    current_names = {column_id: name for name, column_id in current['columns']}
+    other_names = {column_id: name for name, column_id in other['columns']}
+
+    # Operations Leading from one Version to the Other
+    ids = [version['id'] for version in versions['versions']]
+    start, end = sorted((ids.index(other['id']), ids.index(current['id'])))
+    ops = [op for version in versions['versions'][start + 1:end + 1] for op in version['ops']]
+
+    return {
+        'version': other,
+        'current': current,
+        'ops': ops,
+        'added': [name for name, column_id in current['columns'] if name not in other_ids and column_id not in other_names],
+        'removed': [name for name, column_id in other['columns'] if name not in current_ids and column_id not in current_names],
+        'renamed': [(other_names[column_id], name) for name, column_id in current['columns']
+                    if column_id in other_names and other_names[column_id] != name],
+        'changed': [name for name, column_id in current['columns'] if name in other_ids and other_ids[name] != column_id],
+        'unchanged': [name for name, column_id in current['columns'] if other_ids.get(name) == column_id],
+    }
+
+
+def evict_versions(store_path, versions, max_bytes=VERSION_STORE_BYTES):
+    # Drop the Oldest Versions (never the Current one) until their Column Files Fit the Budget
+    while len(versions['versions']) > 1 and get_stored_bytes(store_path, versions) > max_bytes:
+        if versions['versions'][0]['id'] != versions['current']:
+            versions['versions'].pop(0)
+        else:
+            versions['versions'].pop()
+    delete_unused_columns(store_path, versions)
+
+
+def get_stored_bytes(store_path, versions):
+    column_ids = {column_id for version in versions['versions'] for _, column_id in version['columns']}
+    return sum(os.path.getsize(get_column_path(store_path, column_id)) for column_id in column_ids)
+
+
+def delete_unused_columns(store_path, versions):
+    column_ids = {column_id for version in versions['versions'] for _, column_id in version['columns']}
+    columns_folder = os.path.dirname(get_column_path(store_path, ''))
+    for entry in os.scandir(columns_folder):
+        if entry.name.endswith('.feather') and entry.name[:-len('.feather')] not in column_ids:
+            os.remove(entry.path)